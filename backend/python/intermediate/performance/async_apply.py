@@ -0,0 +1,164 @@
+# ======== ASYNC APPLY_FUNC ========= #
+
+"""
+apply_func of Module 4 waits for every func(element) before starting the next one. When func mostly waits (a file,
+a local service), the program is idle most of the time.
+
+iter_apply / async_apply run func (a coroutine function, 'async def') on many elements at the same time in one
+event loop:
+    - concurrency : at most this many calls are running (a fixed number of workers pull the elements)
+    - timeout     : seconds allowed for one call, asyncio.TimeoutError after that
+    - ordered     : yield the results in the order of the elements, or as soon as they complete
+
+    async for index, result in iter_apply(urls, fetch, concurrency=20, timeout=5):
+        ...
+    results = asyncio.run(async_apply(urls, fetch))    # list in the order of the elements
+
+The first error cancels the running calls and is raised, like asyncio.gather. With return_exceptions=True the
+exception is returned in place of the result instead. An error raised by the elements iterable itself (a failing
+generator) is always raised, it stops the calls like a first error.
+In ordered mode a slow element holds back the results after it, they wait in memory until it is done.
+"""
+
+import asyncio
+import inspect
+
+DEFAULT_CONCURRENCY = 16
+
+_DONE = object()  # a worker has no more elements
+
+
+async def _call(func, element, timeout):
+    result = func(element)
+    if inspect.isawaitable(result):  # a plain function works too
+        result = await asyncio.wait_for(result, timeout)
+    return result
+
+
+async def iter_apply(elements, func, concurrency=DEFAULT_CONCURRENCY, timeout=None, ordered=False,
+                     return_exceptions=False):
+    """Yield (index, func(element)) for every element, at most concurrency calls at the same time"""
+    if concurrency <= 0:
+        raise ValueError('concurrency must be positive')
+    items = enumerate(elements)  # shared by the workers: each next() happens between two awaits
+    queue = asyncio.Queue()
+
+    async def worker():
+        try:
+            for index, element in items:
+                try:
+                    await queue.put((index, await _call(func, element, timeout), False))
+                except Exception as e:
+                    await queue.put((index, e, True))
+        except Exception as e:  # the elements iterable itself failed: index None, always raised
+            await queue.put((None, e, True))
+        await queue.put(_DONE)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    running = len(workers)
+    waiting = {}  # ordered mode: results that arrived before the previous ones
+    next_index = 0
+    try:
+        while running:
+            message = await queue.get()
+            if message is _DONE:
+                running -= 1
+                continue
+            index, value, failed = message
+            if failed and (index is None or not return_exceptions):
+                raise value
+            if not ordered:
+                yield index, value
+                continue
+            waiting[index] = value
+            while next_index in waiting:
+                yield next_index, waiting.pop(next_index)
+                next_index += 1
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def async_apply(elements, func, concurrency=DEFAULT_CONCURRENCY, timeout=None, return_exceptions=False):
+    """Return [await func(element) for element in elements], computed concurrently"""
+    return [result async for _, result in iter_apply(elements, func, concurrency, timeout, True, return_exceptions)]
+
+
+# ======= BENCHMARK ======= #
+
+DELAY = 0.01  # the stand-in service answers after 10 ms
+
+
+async def _handle(reader, writer):
+    line = await reader.readline()
+    await asyncio.sleep(DELAY)
+    writer.write(line.upper())
+    await writer.drain()
+    writer.close()
+
+
+def _start_server():
+    """Run the stand-in service in its own thread and event loop, return its port"""
+    import threading
+
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    port = []
+
+    async def serve():
+        server = await asyncio.start_server(_handle, '127.0.0.1', 0, backlog=1024)
+        port.append(server.sockets[0].getsockname()[1])
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    threading.Thread(target=loop.run_until_complete, args=(serve(),), daemon=True).start()
+    ready.wait()
+    return port[0]
+
+
+if __name__ == '__main__':
+    import socket
+    import statistics
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    port = _start_server()
+    latencies = []
+
+    def fetch(element):  # blocking version for the serial apply_func
+        start = time.perf_counter()
+        with socket.create_connection(('127.0.0.1', port)) as sock:
+            sock.sendall('{}\n'.format(element).encode())
+            answer = sock.makefile('rb').readline()
+        latencies.append(time.perf_counter() - start)
+        return answer
+
+    async def async_fetch(element):
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write('{}\n'.format(element).encode())
+        answer = await reader.readline()
+        writer.close()
+        await writer.wait_closed()
+        latencies.append(time.perf_counter() - start)
+        return answer
+
+    def report(label, elapsed):
+        print('  {:<22} {:>6.2f} s  {:>7.0f} calls/s  latency p50 {:>5.1f} ms  p95 {:>5.1f} ms'.format(
+            label, elapsed, count / elapsed, statistics.median(latencies) * 1e3,
+            statistics.quantiles(latencies, n=20)[-1] * 1e3))
+
+    elements = ['item{}'.format(i) for i in range(count)]
+    print(count, 'calls to a local service answering after', DELAY * 1e3, 'ms')
+    start = time.perf_counter()
+    expected = [fetch(element) for element in elements]  # serial apply_func
+    report('serial apply_func', time.perf_counter() - start)
+    for concurrency in (4, 16, 64):
+        latencies = []
+        start = time.perf_counter()
+        result = asyncio.run(async_apply(elements, async_fetch, concurrency=concurrency, timeout=5))
+        report('async_apply x{}'.format(concurrency), time.perf_counter() - start)
+        assert result == expected
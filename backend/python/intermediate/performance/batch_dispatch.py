@@ -0,0 +1,232 @@
+# ======== TYPE BUCKETED BATCH DISPATCH ========= #
+
+"""
+Module 3 (polymorphism): Animal.present() calls self.produce_sound(), Dog overrides produce_sound, and Python finds
+the right method object by object, at every call:
+
+    for animal in animals:        # every call looks 'present' up in the object, then along the class line
+        animal.present()
+
+Since Python 3.11 the interpreter caches the method lookup at the call site, so a plain call is cheap. Grouping a
+mixed list costs more than the lookups it saves. Putting the results back in list order costs about as much again.
+The gain comes from keeping the objects grouped from the start and, when possible, not reordering: TypeBuckets
+puts every object in the list of its type when it is added, and remembers its position.
+
+    animals = TypeBuckets(objects)
+    animals.call('present')             # same results as [obj.present() for obj in objects], same order
+    animals.call_by_type('present')     # {type: results}, no reordering at all
+
+There is no one shot version for a plain list: grouping it for one call is slower than the plain loop.
+
+For every type, the method is found once, in the __dict__ of the classes of the MRO:
+    - a method marked with @constant_per_type (its result only depends on the class and the arguments, like
+      produce_sound here) is called once for the whole group, when the result is immutable (str, int, ...): a
+      mutable result (a list) is not shared, the method is called for every object
+    - the batch path of the type when it has one: a classmethod named '<method>_batch' taking the whole group, used
+      only when it is defined in the class that defines the method or in a subclass of it (a subclass that
+      overrides present() but not present_batch() is not given the wrong batch path)
+    - otherwise the plain function of the class is mapped on the group: no bound method object per call. A
+      staticmethod, a classmethod or another descriptor is bound on each object, as obj.present would be
+
+The calls are made type by type, not in list order: this is for methods without side effects between objects.
+An instance attribute with the name of the method (obj.__dict__['present'] = ...) is not looked at: checking
+every __dict__ would cost more than the call.
+
+Animal and Dog below are the Module 3 classes, with present() / produce_sound() returning the text instead of
+printing it, so that the results can be compared.
+"""
+
+from collections import deque
+from types import FunctionType
+
+BATCH_SUFFIX = '_batch'
+_IMMUTABLE = frozenset((str, bytes, int, float, complex, bool, type(None), frozenset))  # safe to share
+
+
+def constant_per_type(function):
+    """Mark a method whose result only depends on the class of the object (and the arguments)"""
+    function.constant_per_type = True
+    return function
+
+
+class Animal:
+    def __init__(self):
+        self.species = 'general'
+
+    @constant_per_type
+    def produce_sound(self):
+        return 'General  animal sound'
+
+    def present(self):
+        return 'i can do the following sound \n' + self.produce_sound() + '\nspecies = ' + self.species
+
+    @classmethod
+    def present_batch(cls, animals):
+        produce_sound, _ = resolve(cls, 'produce_sound')  # the override of the group type, found once
+        if getattr(produce_sound, 'constant_per_type', False):
+            head = 'i can do the following sound \n' + produce_sound(animals[0]) + '\nspecies = '
+            return [head + animal.species for animal in animals]
+        return ['i can do the following sound \n' + sound + '\nspecies = ' + animal.species
+                for sound, animal in zip(call_group(cls, 'produce_sound', animals), animals)]
+
+
+class Dog(Animal):
+    def __init__(self):
+        self.species = 'wolf dog '
+
+    @constant_per_type
+    def produce_sound(self):
+        return 'Wolf Wolf sound'
+
+
+def _definer(cls, name):
+    """First class of the MRO of cls defining name"""
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return klass
+    return None
+
+
+def _bound_on_instance(name, attribute):
+    """function(obj, *args) calling getattr(obj, name)(*args): the descriptor binds it as it would for obj"""
+    def call(obj, *args):
+        return getattr(obj, name)(*args)
+
+    call.constant_per_type = getattr(getattr(attribute, '__func__', attribute), 'constant_per_type', False)
+    return call
+
+
+def resolve(cls, name):
+    """(function, is_batch) to call for the objects of type cls: function(obj, *args), or function(group, *args)"""
+    method_class = _definer(cls, name)
+    if method_class is None:
+        raise AttributeError('{!r} object has no attribute {!r}'.format(cls.__name__, name))
+    batch_class = _definer(cls, name + BATCH_SUFFIX)
+    if batch_class is not None and issubclass(batch_class, method_class):
+        return getattr(cls, name + BATCH_SUFFIX), True  # a classmethod: bound to cls
+    attribute = method_class.__dict__[name]
+    if type(attribute) is FunctionType:  # a plain method: the function takes the object as self
+        return attribute, False
+    return _bound_on_instance(name, attribute), False
+
+
+def call_group(cls, name, group, *args):
+    """[getattr(obj, name)(*args) for obj in group], group being objects of type cls"""
+    function, is_batch = resolve(cls, name)
+    if is_batch:
+        results = function(group, *args)
+        if len(results) != len(group):
+            raise ValueError('{}.{}{} returned {} results for {} objects'.format(
+                cls.__name__, name, BATCH_SUFFIX, len(results), len(group)))
+        return results
+    if getattr(function, 'constant_per_type', False) and group:
+        result = function(group[0], *args)
+        if type(result) in _IMMUTABLE:
+            return [result] * len(group)
+        return [result] + [function(obj, *args) for obj in group[1:]]  # every object gets its own result
+    if args:
+        return [function(obj, *args) for obj in group]
+    return list(map(function, group))
+
+
+class TypeBuckets:
+    """Objects kept in one list per concrete type"""
+
+    def __init__(self, objects=()):
+        self.buckets = {}  # type -> [objects]
+        self.positions = {}  # type -> [position of each object in the order they were added]
+        self._count = 0
+        self.extend(objects)
+
+    def append(self, obj):
+        cls = type(obj)
+        bucket = self.buckets.get(cls)
+        if bucket is None:
+            bucket = self.buckets[cls] = []
+            self.positions[cls] = []
+        bucket.append(obj)
+        self.positions[cls].append(self._count)
+        self._count += 1
+
+    def extend(self, objects):
+        buckets, positions = self.buckets, self.positions
+        for position, obj in enumerate(objects, self._count):
+            cls = type(obj)
+            try:
+                buckets[cls].append(obj)
+            except KeyError:
+                buckets[cls] = [obj]
+                positions[cls] = []
+            positions[cls].append(position)
+            self._count = position + 1
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """The objects in the order they were added"""
+        return iter(self._ordered({cls: bucket for cls, bucket in self.buckets.items()}))
+
+    def _ordered(self, by_type):
+        if len(by_type) == 1:  # one type: already in order
+            return next(iter(by_type.values()))
+        result = [None] * self._count
+        for cls, values in by_type.items():
+            deque(map(result.__setitem__, self.positions[cls], values), maxlen=0)  # C loop, no Python bytecode
+        return result
+
+    def call_by_type(self, name, *args):
+        """{type: results of the method on the objects of that type}"""
+        return {cls: call_group(cls, name, bucket, *args) for cls, bucket in self.buckets.items()}
+
+    def call(self, name, *args):
+        """[getattr(obj, name)(*args) for obj in self], in the order the objects were added"""
+        if not self._count:
+            return []
+        return self._ordered(self.call_by_type(name, *args))
+
+
+# ======= BENCHMARK ======= #
+
+class Cat(Animal):  # not marked: its produce_sound is mapped on the group
+    def __init__(self):
+        self.species = 'cat'
+
+    def produce_sound(self):
+        return 'Meow'
+
+
+class Parrot(Animal):  # overrides present() but not present_batch(): dispatch must not use the batch path
+    def __init__(self):
+        self.species = 'parrot'
+
+    def present(self):
+        return 'i can talk\nspecies = ' + self.species
+
+
+if __name__ == '__main__':
+    import random
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    random.seed(0)
+    classes = [Animal, Dog, Cat, Parrot]
+    objects = [random.choice(classes)() for _ in range(count)]
+
+    def run(label, func):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        print('  {:<40} {:>7.3f} s  {:>6.0f} ns per object'.format(label, elapsed, elapsed / count * 1e9))
+        return result
+
+    print('{} mixed objects ({})'.format(count, ', '.join(cls.__name__ for cls in classes)))
+    expected_present = run('[obj.present() for obj in objects]', lambda: [obj.present() for obj in objects])
+    expected = run('[obj.produce_sound() for obj in objects]', lambda: [obj.produce_sound() for obj in objects])
+    buckets = run('TypeBuckets(objects) (grouping alone)', lambda: TypeBuckets(objects))
+    assert list(buckets) == objects
+    assert run("buckets.call('present')", lambda: buckets.call('present')) == expected_present
+    assert run("buckets.call('produce_sound')", lambda: buckets.call('produce_sound')) == expected
+    by_type = run("buckets.call_by_type('present')", lambda: buckets.call_by_type('present'))
+    assert sum(map(len, by_type.values())) == count
@@ -0,0 +1,207 @@
+# ======== BATCH KERNELS WITHOUT PER-ITEM EXCEPTIONS ========= #
+
+"""
+Module 4 (exceptions) checks every call on its own:
+
+    def return_bigger(a, b):                def calcul_inverse(number):         def little_calcul(number):
+        if not isinstance(a, int) or ...        assert (number != 0), ...           assert (number != 0)
+            raise ValueError                    return 1/number                     return 0 / number
+        ...
+
+On a batch of millions of rows, raising and catching one exception per bad row costs more than the computation.
+The batch versions take whole sequences and never raise for a bad row, they return a BatchResult:
+
+    values      the results, fill where the row is bad
+    valid       mask of the good rows
+    reasons     one code per row: OK, NOT_INT, NOT_NUMBER or ZERO, error_report() gives (index, message) pairs
+
+    result = calcul_inverse_batch(numbers)
+    good = result.values[result.valid]      # NumPy input
+    result.error_report(10)                 # [(3, 'division by zero'), ...]
+
+NumPy arrays with a numeric dtype (NumPy is optional) are checked and computed with a few whole-array operations.
+Lists, and NumPy arrays of Python objects, are checked with one isinstance / comparison per row in a list
+comprehension: still no exception, and exactly the results of the one-row functions. A number is any numbers.Number,
+as the one-row functions accept them: int, float, NumPy scalars, Fraction, Decimal, complex. The result has the type
+of the input: arrays for arrays, lists for lists.
+"""
+
+from numbers import Number
+
+try:
+    import numpy as np
+except ImportError:  # optional, only needed for NumPy input
+    np = None
+
+OK = 0
+NOT_INT = 1
+NOT_NUMBER = 2
+ZERO = 3
+MESSAGES = {NOT_INT: 'not an int', NOT_NUMBER: 'not a number', ZERO: 'division by zero'}
+_EXACT_NUMBERS = frozenset((int, float))  # one set lookup for the common rows, isinstance(x, Number) is 4x slower
+
+
+class BatchResult:
+    def __init__(self, values, valid, reasons):
+        self.values = values
+        self.valid = valid
+        self.reasons = reasons
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def error_count(self):
+        if np is not None and isinstance(self.valid, np.ndarray):
+            return len(self.valid) - int(np.count_nonzero(self.valid))
+        return len(self.valid) - sum(self.valid)
+
+    def error_report(self, limit=None):
+        """[(index, message)] for the first limit bad rows"""
+        if np is not None and isinstance(self.reasons, np.ndarray):
+            indexes = np.flatnonzero(self.reasons)[:limit].tolist()
+        else:
+            indexes = [i for i, reason in enumerate(self.reasons) if reason][:limit]
+        return [(i, MESSAGES[int(self.reasons[i])]) for i in indexes]
+
+    def __repr__(self):
+        return 'BatchResult({} rows, {} errors)'.format(len(self), self.error_count)
+
+
+def _numeric_array(values, kinds):
+    """values if it is a NumPy array whose dtype kind is in kinds"""
+    return np is not None and isinstance(values, np.ndarray) and values.dtype.kind in kinds
+
+
+def _as_arrays(result, value_dtype):
+    """list result of an object array input, back to arrays"""
+    try:
+        values = np.array(result.values, dtype=value_dtype)
+    except (TypeError, ValueError):  # complex results stay objects
+        values = np.array(result.values, dtype=object)
+    return BatchResult(values, np.array(result.valid, dtype=bool), np.array(result.reasons, dtype=np.int8))
+
+
+def _divide_list(numerator, numbers, fill):
+    is_number = [type(x) in _EXACT_NUMBERS or isinstance(x, Number) for x in numbers]
+    valid = [number and x != 0 for x, number in zip(numbers, is_number)]
+    values = [numerator / x if ok else fill for x, ok in zip(numbers, valid)]
+    reasons = [OK if ok else ZERO if number else NOT_NUMBER for ok, number in zip(valid, is_number)]
+    return BatchResult(values, valid, reasons)
+
+
+def _divide(numerator, numbers, fill):
+    if _numeric_array(numbers, 'iubf'):
+        nonzero = numbers != 0  # NaN != 0: 1 / NaN is NaN, like 1 / float('nan')
+        values = np.full(numbers.shape, fill, dtype=np.float64)
+        np.divide(numerator, numbers, out=values, where=nonzero)
+        return BatchResult(values, nonzero, np.where(nonzero, OK, ZERO).astype(np.int8))
+    if np is not None and isinstance(numbers, np.ndarray):
+        return _as_arrays(_divide_list(numerator, numbers.tolist(), fill), np.float64)
+    return _divide_list(numerator, numbers, fill)
+
+
+def calcul_inverse_batch(numbers, fill=0.0):
+    """1 / number for every number, ZERO / NOT_NUMBER rows get fill"""
+    return _divide(1, numbers, fill)
+
+
+def little_calcul_batch(numbers, fill=0.0):
+    """0 / number for every number, ZERO / NOT_NUMBER rows get fill"""
+    return _divide(0, numbers, fill)
+
+
+def _bigger_list(a, b, fill):
+    valid = [isinstance(x, int) and isinstance(y, int) for x, y in zip(a, b)]  # bool is an int, like return_bigger
+    values = [(y if y > x else x) if ok else fill for x, y, ok in zip(a, b, valid)]
+    return BatchResult(values, valid, [OK if ok else NOT_INT for ok in valid])
+
+
+def _int_maximum(a, b):
+    """np.maximum of two integer arrays, exact when NumPy would go through float64 (uint64 with a signed type)"""
+    if np.result_type(a, b).kind != 'f':
+        return np.maximum(a, b)
+    unsigned, signed = (a, b) if a.dtype.kind == 'u' else (b, a)
+    # the bigger of the two is at least the unsigned value: never negative, it fits in uint64
+    return np.maximum(unsigned, np.maximum(signed, 0).astype(np.uint64))
+
+
+def return_bigger_batch(a, b, fill=0):
+    """The bigger of a[i] and b[i] when both are ints, NOT_INT rows get fill"""
+    if len(a) != len(b):
+        raise ValueError('a and b must have the same length')
+    if _numeric_array(a, 'iub') and _numeric_array(b, 'iub'):  # integer dtypes: every row is valid
+        count = len(a)
+        return BatchResult(_int_maximum(a, b), np.ones(count, dtype=bool), np.zeros(count, dtype=np.int8))
+    if _numeric_array(a, 'iubf') and _numeric_array(b, 'iubf'):  # a float dtype: floats are not ints
+        count = len(a)
+        return BatchResult(np.full(count, fill), np.zeros(count, dtype=bool), np.full(count, NOT_INT, dtype=np.int8))
+    if np is not None and (isinstance(a, np.ndarray) or isinstance(b, np.ndarray)):
+        a = a.tolist() if isinstance(a, np.ndarray) else a
+        b = b.tolist() if isinstance(b, np.ndarray) else b
+        return _as_arrays(_bigger_list(a, b, fill), object)
+    return _bigger_list(a, b, fill)
+
+
+# ======= BENCHMARK ======= #
+
+def return_bigger(a, b):  # Module 4
+    if not isinstance(a, int) or not isinstance(b, int):
+        raise ValueError
+    if b > a:
+        return b
+    else:
+        return a
+
+
+def calcul_inverse(number):  # Module 4
+    assert (number != 0), 'The number can not be 0'
+    return 1 / number
+
+
+def _per_item(function, *columns):
+    """The usual batch loop: try / except around every row"""
+    values = []
+    errors = []
+    for index, row in enumerate(zip(*columns)):
+        try:
+            values.append(function(*row))
+        except (ValueError, AssertionError, ZeroDivisionError) as e:
+            values.append(0)
+            errors.append((index, e))
+    return values, errors
+
+
+if __name__ == '__main__':
+    import random
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    random.seed(0)
+
+    def run(label, func):
+        start = time.perf_counter()
+        result = func()
+        print('    {:<34} {:>8.1f} ns per row'.format(label, (time.perf_counter() - start) / count * 1e9))
+        return result
+
+    for bad_rate in (0.0, 0.01, 0.5):
+        bad = [random.random() < bad_rate for _ in range(count)]
+        print('{:.0%} bad rows, {} rows, numpy: {}'.format(bad_rate, count, np is not None))
+        a = [random.randrange(1000) for _ in range(count)]
+        b = ['x' if is_bad else random.randrange(1000) for is_bad in bad]
+        values, errors = run('return_bigger per row + except', lambda: _per_item(return_bigger, a, b))
+        result = run('return_bigger_batch(list)', lambda: return_bigger_batch(a, b))
+        assert result.values == values and [i for i, _ in errors] == [i for i, _ in result.error_report()]
+
+        numbers = [0 if is_bad else random.randrange(1, 1000) for is_bad in bad]
+        values, errors = run('calcul_inverse per row + except', lambda: _per_item(calcul_inverse, numbers))
+        result = run('calcul_inverse_batch(list)', lambda: calcul_inverse_batch(numbers))
+        assert result.values == values and len(errors) == result.error_count
+        if np is not None:
+            array = np.array(numbers)
+            result = run('calcul_inverse_batch(int64 array)', lambda: calcul_inverse_batch(array))
+            assert result.values.tolist() == values
+            left, right = np.array(a), np.array(numbers)
+            run('return_bigger_batch(int64 arrays)', lambda: return_bigger_batch(left, right))
@@ -0,0 +1,471 @@
+# ======== COMPACT BINARY STORE WITH LAZY LOADING ========= #
+
+"""
+Keeping Student / Dog / Cat objects (Module 3) between two runs with pickle means writing the __dict__ of every
+object, and pickle.load rebuilds every object and every dict before the program can start. dump() writes them
+in a binary format described by a schema, BinaryStore maps the file in memory and decodes an object only when
+the program uses it:
+
+    dump(students + dogs + cats, 'animals.bin')     # SCHEMAS: Student, Dog, Cat
+    with BinaryStore('animals.bin') as store:
+        len(store)                      # no object decoded yet
+        store[123456].introduce()       # decodes record 123456 only
+
+A schema gives the attributes to store and their kind: 'str', or a struct code for a fixed-width number ('i' int32,
+'H' uint16, 'q' int64, 'd' float, '?' bool, ...). The attribute names are the names in __dict__: the private
+__age of Dog is '_Dog__age'.
+
+File (little-endian):
+    header          magic, version and the offsets of the sections
+    schemas         JSON: the class name and the fields of every schema, checked against the schemas given to
+                    BinaryStore (a class whose fields changed is refused, not misread)
+    records         one fixed-width record per object: the numbers, and for a string its number in the string table
+    record index    offset (uint64) and schema number (uint8) of every record: record i is found without reading the
+                    others, and records of different classes can be mixed in any order
+    string table    offsets (uint64) and the UTF-8 strings one after another. Every distinct string is stored once
+                    ('ridi' used by 100000 records too), and decoded once per BinaryStore
+
+store[i] returns a lazy proxy: an instance of a subclass of the real class (isinstance works, the methods are the
+class ones) without attributes until the first attribute that is not found, the record is then decoded and the
+later accesses are normal attribute accesses. vars(obj) / obj.__dict__ read before any attribute shows an empty
+dict. pickle and copy give an object of the real class. As with pickle, __init__ is not called (Cat.counter is not
+incremented).
+
+Decoding object by object costs a few microseconds per object: lazy proxies are for programs that use part of
+the objects. A program that needs all of them calls store.load(): every record is decoded at once (struct
+iter_unpack on each run of records of a class, all the strings decoded by C loops) into instances of the real
+classes, with the attributes set like an __init__ does, so the objects are as compact as the ones the program made.
+
+Writing goes by runs of objects of the same class: each attribute is read for the whole run with attrgetter, the
+strings get their number through a dict (one C call per column) and the records are packed by map(Struct.pack).
+"""
+
+import copyreg
+import json
+import keyword
+import mmap
+import struct
+import sys
+from array import array
+from itertools import accumulate, groupby, islice, repeat
+from operator import attrgetter
+
+MAGIC = b'PCAPSTOR'
+VERSION = 1
+CHUNK_SIZE = 10000  # objects packed at once
+NUMBER_KINDS = 'bBhHiIlLqQefd?'  # struct codes of the fixed-width fields
+_HEADER = struct.Struct('<8sHHIQQQQQ')  # magic, version, schemas, schema JSON size, records, then offsets:
+#                                         records, index, string table, and the number of strings
+_STRING_ID = 'I'  # number of a string in the table, uint32
+
+
+class Schema:
+    def __init__(self, cls, fields):
+        """fields: [(attribute, kind)], kind 'str' or one of NUMBER_KINDS"""
+        self.cls = cls
+        self.fields = tuple((name, kind) for name, kind in fields)
+        for name, kind in self.fields:
+            if not name.isidentifier() or keyword.iskeyword(name):
+                raise ValueError('{}: {!r} is not an attribute name'.format(cls.__name__, name))
+            if kind != 'str' and (len(kind) != 1 or kind not in NUMBER_KINDS):
+                raise ValueError('{}.{}: unknown kind {!r}, expected \'str\' or one of {!r}'.format(
+                    cls.__name__, name, kind, NUMBER_KINDS))
+        self.names = tuple(name for name, _ in self.fields)
+        self.string_positions = [i for i, (_, kind) in enumerate(self.fields) if kind == 'str']
+        self.record = struct.Struct('<' + ''.join(_STRING_ID if kind == 'str' else kind for _, kind in self.fields))
+        self.getters = [attrgetter(name) for name in self.names]
+        self.fill = _filler(self.names)
+
+    @property
+    def class_name(self):
+        return self.cls.__module__ + '.' + self.cls.__qualname__
+
+    def description(self):
+        return {'class': self.class_name, 'fields': [list(field) for field in self.fields]}
+
+
+def _filler(names):
+    """fill(obj, values) setting the attributes like the code of an __init__ would (compiled once per schema): the
+    object gets the same compact layout as one made by its class, and it is 2 to 3 times faster than
+    obj.__dict__.update() or setattr() per attribute"""
+    namespace = {}
+    exec('def fill(obj, values):\n    [{}] = values\n'.format(', '.join('obj.' + name for name in names)), namespace)
+    return namespace['fill']
+
+
+class _StringIds(dict):
+    """string -> its number in the string table, numbers given in order of first use"""
+
+    def __missing__(self, string):  # only for a new string, known ones are found by the C lookup of dict
+        number = self[string] = len(self)
+        return number
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _padding(stream):
+    stream.write(b'\0' * (-stream.tell() % 8))  # the uint64 arrays are 8 bytes aligned
+
+
+def dump(objects, path, schemas=None, chunk_size=CHUNK_SIZE):
+    """Write objects to path, every object having the class of one of the schemas, return the number of objects"""
+    schemas = SCHEMAS if schemas is None else list(schemas)
+    if len(schemas) > 256:
+        raise ValueError('at most 256 schemas per file, got {}'.format(len(schemas)))
+    numbers = {schema.cls: number for number, schema in enumerate(schemas)}
+    description = json.dumps([schema.description() for schema in schemas]).encode('utf-8')
+    strings = _StringIds()
+    string_id = strings.__getitem__
+    offsets = array('Q')
+    kinds = array('B')
+    with open(path, 'wb') as stream:
+        stream.write(b'\0' * _HEADER.size)  # written at the end, when the offsets are known
+        stream.write(description)
+        _padding(stream)
+        records_offset = stream.tell()
+        position = 0
+        for cls, run in groupby(objects, type):
+            number = numbers.get(cls)
+            if number is None:
+                raise ValueError('no schema for class {}'.format(cls.__name__))
+            schema = schemas[number]
+            size = schema.record.size
+            chunk = list(islice(run, chunk_size))
+            while chunk:
+                columns = [list(map(getter, chunk)) for getter in schema.getters]
+                for i in schema.string_positions:
+                    columns[i] = map(string_id, columns[i])
+                try:
+                    stream.write(b''.join(map(schema.record.pack, *columns)))
+                except struct.error as error:
+                    raise ValueError('{} does not fit its schema {}: {}'.format(cls.__name__, schema.fields,
+                                                                                error)) from None
+                offsets.extend(range(position, position + size * len(chunk), size))
+                kinds.extend(array('B', [number]) * len(chunk))
+                position += size * len(chunk)
+                chunk = list(islice(run, chunk_size))
+        _padding(stream)
+        index_offset = stream.tell()
+        stream.write(_little_endian(offsets))
+        stream.write(kinds.tobytes())
+        _padding(stream)
+        strings_offset = stream.tell()
+        encoded = [string.encode('utf-8', 'surrogatepass') for string in strings]
+        stream.write(_little_endian(array('Q', accumulate(map(len, encoded), initial=0))))
+        stream.write(b''.join(encoded))
+        stream.seek(0)
+        stream.write(_HEADER.pack(MAGIC, VERSION, len(schemas), len(description), len(offsets), records_offset,
+                                  index_offset, strings_offset, len(strings)))
+    return len(offsets)
+
+
+def _lazy_class(schema):
+    """Subclass of schema.cls whose instances decode their record at the first missing attribute"""
+    cls, names, fill = schema.cls, schema.names, schema.fill
+    parent_getattr = getattr(cls, '__getattr__', None)
+
+    def decode(self, store):
+        fill(self, store._values(self._record))
+        self._store = None  # decoded: from now on a missing attribute is really missing
+
+    def __getattr__(self, name):
+        store = self._store
+        if store is not None:
+            decode(self, store)
+            return getattr(self, name)
+        if parent_getattr is not None:
+            return parent_getattr(self, name)
+        raise AttributeError('{!r} object has no attribute {!r}'.format(cls.__name__, name))
+
+    def __reduce_ex__(self, protocol):  # pickle and copy give an object of the real class
+        if self._store is not None:
+            decode(self, self._store)
+        state = (None, {name: getattr(self, name) for name in names})  # set with setattr, __slots__ or not
+        return copyreg._reconstructor, (cls, object, None), state
+
+    return type('Lazy' + cls.__name__, (cls,), {
+        '__slots__': ('_store', '_record'), '__getattr__': __getattr__, '__reduce_ex__': __reduce_ex__,
+        '__module__': cls.__module__, '__qualname__': 'Lazy' + cls.__qualname__})
+
+
+class _Strings(dict):
+    """number -> string of the string table of a store, decoded at the first use"""
+
+    def __init__(self, store):
+        super().__init__()
+        self.store = store
+
+    def __missing__(self, number):
+        store = self.store
+        start = store._strings_start + store._string_offsets[number]
+        end = store._strings_start + store._string_offsets[number + 1]
+        string = self[number] = str(store._map[start:end], 'utf-8', 'surrogatepass')
+        return string
+
+
+def _uint64s(view):
+    """The uint64 array of a little-endian memory view, without copy when the machine is little-endian"""
+    if sys.byteorder == 'big':
+        values = array('Q', view)
+        values.byteswap()
+        return values
+    return view.cast('Q')
+
+
+class BinaryStore:
+    """Objects of a file written by dump(), decoded on first use"""
+
+    def __init__(self, path, schemas=None):
+        by_name = {schema.class_name: schema for schema in (SCHEMAS if schemas is None else schemas)}
+        with open(path, 'rb') as stream:
+            self._map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)  # the file stays mapped
+        try:
+            (magic, version, _, description_size, count, self._records_offset, index_offset,
+             strings_offset, string_count) = _HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = version = None
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError('{} is not a binary store file of version {}'.format(path, VERSION))
+        self._schemas = []
+        self._lazy_classes = []
+        for entry in json.loads(self._map[_HEADER.size:_HEADER.size + description_size]):
+            schema = by_name.get(entry['class'])
+            if schema is None or [list(field) for field in schema.fields] != entry['fields']:
+                self._map.close()
+                raise ValueError('{}: no schema for class {} with the fields {}'.format(path, entry['class'],
+                                                                                       entry['fields']))
+            self._schemas.append(schema)
+            self._lazy_classes.append(_lazy_class(schema))
+        self._count = count
+        view = memoryview(self._map)
+        kinds_offset = index_offset + 8 * count
+        self._strings_start = strings_offset + 8 * (string_count + 1)
+        self._views = [view, view[index_offset:kinds_offset], view[kinds_offset:kinds_offset + count],
+                       view[strings_offset:self._strings_start]]
+        self._offsets = _uint64s(self._views[1])
+        self._kinds = self._views[2]
+        self._string_offsets = _uint64s(self._views[3])
+        self._views += [self._offsets, self._string_offsets]
+        self._strings = _Strings(self)  # number -> str, every string decoded once
+        self._objects = {}  # index -> lazy object: store[i] is store[i]
+
+    def __len__(self):
+        return self._count
+
+    def _index(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('BinaryStore index out of range')
+        return index
+
+    def _values(self, index):
+        if self._map.closed:
+            raise ValueError('BinaryStore is closed')
+        schema = self._schemas[self._kinds[index]]
+        values = schema.record.unpack_from(self._map, self._records_offset + self._offsets[index])
+        if not schema.string_positions:
+            return values
+        values = list(values)
+        for position in schema.string_positions:
+            values[position] = self._strings[values[position]]
+        return values
+
+    def record(self, index):
+        """The attribute values of object index, in schema order, without creating the object"""
+        return tuple(self._values(self._index(index)))
+
+    def _new(self, index):
+        lazy = self._lazy_classes[self._kinds[index]]
+        obj = self._objects[index] = lazy.__new__(lazy)  # no __init__, like pickle
+        obj._store = self
+        obj._record = index
+        return obj
+
+    def __getitem__(self, index):
+        index = self._index(index)
+        obj = self._objects.get(index)
+        return self._new(index) if obj is None else obj
+
+    def __iter__(self):
+        objects = self._objects
+        for index in range(self._count):
+            obj = objects.get(index)
+            yield self._new(index) if obj is None else obj
+
+    def load(self):
+        """Every object, decoded now as an instance of its real class: for a program that uses all of them"""
+        if self._map.closed:
+            raise ValueError('BinaryStore is closed')
+        offsets = self._string_offsets
+        table = self._map[self._strings_start:self._strings_start + offsets[len(offsets) - 1]]
+        # every string is needed: all decoded at once, by C loops
+        strings = list(map(str, map(table.__getitem__, map(slice, offsets[:-1], offsets[1:])), repeat('utf-8'),
+                           repeat('surrogatepass')))
+        del table
+        objects = []
+        append = objects.append
+        index = 0
+        for kind, run in groupby(self._kinds):
+            schema = self._schemas[kind]
+            cls, count = schema.cls, len(list(run))
+            start = self._records_offset + self._offsets[index]  # the records of a run are contiguous
+            with self._views[0][start:start + count * schema.record.size] as records:
+                columns = list(zip(*schema.record.iter_unpack(records)))  # C loops, one per step
+            for position in schema.string_positions:
+                columns[position] = map(strings.__getitem__, columns[position])
+            new, fill = cls.__new__, schema.fill
+            for row in zip(*columns):
+                obj = new(cls)
+                fill(obj, row)
+                append(obj)
+            index += count
+        return objects
+
+    def close(self):
+        """Unmap the file: the objects not decoded yet can not be decoded any more"""
+        if not self._map.closed:
+            for view in reversed(self._views):
+                if isinstance(view, memoryview):
+                    view.release()
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Student:  # Module 3
+    def __init__(self, s_name, s_age, s_grade):
+        self.name = s_name
+        self.age = s_age
+        self.grade = s_grade
+
+    def introduce(self):
+        print('Hello i\'m a student, my name is', self.name, 'my grade is', self.grade, 'and i\'m', self.age)
+
+
+class Dog:  # Module 3
+    def __init__(self, named, age=0):
+        self.name = named
+        self.__age = age
+
+    def introduce(self):
+        print('Im a dog, my name is', self.name, 'my age is', self.__age)
+
+
+class Cat:  # Module 3
+    counter = 0
+
+    def __init__(self, namedd, age=0):
+        self.name = namedd
+        self.__age = age
+        Cat.counter += 1
+
+
+SCHEMAS = [
+    Schema(Student, [('name', 'str'), ('age', 'H'), ('grade', 'i')]),
+    Schema(Dog, [('name', 'str'), ('_Dog__age', 'H')]),
+    Schema(Cat, [('name', 'str'), ('_Cat__age', 'H')]),
+]
+
+
+# ======= BENCHMARK ======= #
+
+def _sample_objects(count):
+    import random
+
+    generator = random.Random(0)
+    first_names = ['ridi', 'anna', 'marc', 'lea', 'tom', 'sara', 'paul', 'ines', 'élodie', 'zoë']
+    objects = []
+    for i in range(count):
+        name = generator.choice(first_names) + str(generator.randrange(100000))
+        if i % 2 == 0:
+            objects.append(Student(name, generator.randint(17, 30), generator.randrange(21)))
+        else:
+            objects.append((Dog if i % 4 == 1 else Cat)(name, generator.randrange(15)))
+    objects.sort(key=lambda obj: type(obj).__name__)  # stored class by class, like lists of students, dogs, cats
+    return objects
+
+
+def _write(path, count, sender):
+    import pickle
+    import time
+
+    objects = _sample_objects(count)
+    times = []
+    start = time.perf_counter()
+    with open(path + '.pickle', 'wb') as stream:
+        pickle.dump(objects, stream, pickle.HIGHEST_PROTOCOL)
+    times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    dump(objects, path + '.bin')
+    times.append(time.perf_counter() - start)
+    sender.send((times, sum(len(obj.name) for obj in objects)))
+
+
+def _load(kind, path, sender):
+    import pickle
+    import random
+    import resource
+    import time
+
+    def peak():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+    start = time.perf_counter()
+    if kind == 'pickle':
+        with open(path + '.pickle', 'rb') as stream:
+            objects = pickle.load(stream)
+    elif kind == 'load':
+        with BinaryStore(path + '.bin') as store:
+            objects = store.load()
+    else:
+        objects = BinaryStore(path + '.bin')
+    results = [time.perf_counter() - start, peak()]
+    start = time.perf_counter()
+    sample = random.Random(1).sample(range(len(objects)), len(objects) // 100)
+    checksum = sum(len(objects[i].name) for i in sample)
+    results += [time.perf_counter() - start, peak()]
+    start = time.perf_counter()
+    checksum = sum(len(obj.name) for obj in objects)
+    results += [time.perf_counter() - start, peak(), checksum]
+    sender.send(results)
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    import os
+    import tempfile
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000  # objects: 1/2 Student, 1/4 Dog, 1/4 Cat
+    fork = multiprocessing.get_context('fork')
+
+    def in_process(target, *args):  # a fresh process: its peak RSS is its own, not the one of the others
+        receiver, sender = multiprocessing.Pipe(False)
+        process = fork.Process(target=target, args=args + (sender,))
+        process.start()
+        result = receiver.recv()
+        process.join()
+        return result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'objects')
+        (pickle_time, dump_time), checksum = in_process(_write, path, count)
+        print('{} objects (Student, Dog, Cat)'.format(count))
+        print('  write   pickle.dump {:>6.2f} s {:>7.1f} MB    dump() {:>6.2f} s {:>7.1f} MB'.format(
+            pickle_time, os.path.getsize(path + '.pickle') / 1e6, dump_time, os.path.getsize(path + '.bin') / 1e6))
+        print('  {:<20}{:>33}{:>33}{:>33}'.format('load', 'startup', 'then 1% of the objects', 'then every object'))
+        for label, kind in [('pickle.load', 'pickle'), ('BinaryStore (lazy)', 'store'),
+                            ('BinaryStore.load()', 'load')]:
+            results = in_process(_load, kind, path)
+            assert results[-1] == checksum
+            print('  {:<20}'.format(label) + ''.join('{:>11.3f} s {:>7.1f} MB peak RSS'.format(elapsed, rss)
+                                                     for elapsed, rss in zip(results[0:6:2], results[1:6:2])))
@@ -0,0 +1,184 @@
+# ======== RANDOM ACCESS BLOCK READER ========= #
+
+"""
+Binary file reading of Module 4 (testb.bin):
+
+    bf = open('testb.bin', 'rb')
+    byte_array = bf.read()      # the whole file in a new bytes object
+    byte_array = bf.read(10)    # 10 bytes from offset 0, again a new bytes object
+
+Every read() allocates a new object, and a partial read always starts where the stream currently is.
+BlockReader reads into buffers that are allocated once and reused (readinto / os.preadv), reads at any offset without
+moving a shared file position (os.pread), and hands out memoryview slices so nothing is copied.
+
+A memoryview returned by blocks() or view() points into the reused buffer: it is only valid until the next read.
+Copy it (bytes(view)) if you need to keep it.
+"""
+
+import os
+import threading
+import zlib
+
+DEFAULT_BLOCK_SIZE = 1 << 16  # 64 KiB
+
+_HAS_PREAD = hasattr(os, 'pread')
+_HAS_PREADV = hasattr(os, 'preadv')
+
+
+class BlockReader:
+    """Read fixed size blocks of a binary file at arbitrary offsets into preallocated buffers"""
+
+    def __init__(self, path, block_size=DEFAULT_BLOCK_SIZE):
+        if block_size <= 0:
+            raise ValueError('block_size must be positive')
+        self.path = path
+        self.block_size = block_size
+        self._stream = open(path, 'rb', buffering=0)  # no python buffer, we already read big blocks
+        self._fd = self._stream.fileno()
+        self._buffer = bytearray(block_size)
+        self._view = memoryview(self._buffer)
+        self._lock = threading.Lock()  # only used without pread, where seek + read must not be interleaved
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if not self._stream.closed:
+            self._view.release()
+            self._stream.close()
+
+    @property
+    def size(self):
+        return os.fstat(self._fd).st_size
+
+    def readinto(self, buffer, offset):
+        """Fill buffer with the bytes starting at offset, return the number of bytes read (0 at the end of file)"""
+        if offset < 0:
+            raise ValueError('offset must be positive')
+        if _HAS_PREADV:
+            return os.preadv(self._fd, [buffer], offset)
+        with self._lock:
+            self._stream.seek(offset)
+            return self._stream.readinto(buffer)
+
+    def pread(self, size, offset):
+        """Return size bytes starting at offset as a new bytes object (does not move the file position)"""
+        if offset < 0:
+            raise ValueError('offset must be positive')
+        if _HAS_PREAD:
+            return os.pread(self._fd, size, offset)
+        with self._lock:
+            self._stream.seek(offset)
+            return self._stream.read(size)
+
+    def view(self, offset, size=None):
+        """Read up to size bytes (default block_size) at offset into the internal buffer and return a memoryview"""
+        if size is None:
+            size = self.block_size
+        if size > len(self._buffer):  # grow once, then the bigger buffer is reused
+            self._view.release()
+            self._buffer = bytearray(size)
+            self._view = memoryview(self._buffer)
+        n = self.readinto(self._view[:size], offset)
+        return self._view[:n]
+
+    def blocks(self, start=0, end=None):
+        """Yield (offset, memoryview) for every block between start and end, all read into the same buffer"""
+        if end is None:
+            end = self.size
+        offset = start
+        buffer = self._view[:self.block_size]
+        while offset < end:
+            n = self.readinto(buffer[:min(self.block_size, end - offset)], offset)
+            if n == 0:
+                break
+            yield offset, buffer[:n]
+            offset += n
+
+
+# ======= BENCHMARK ======= #
+
+def _scan_read_all(path, block_size):
+    with open(path, 'rb') as bf:
+        byte_array = bf.read()  # current path of b.py: the whole file in memory
+    return zlib.crc32(byte_array)
+
+
+def _scan_read(path, block_size):
+    crc = 0
+    with open(path, 'rb') as bf:
+        byte_array = bf.read(block_size)  # a new bytes object per block
+        while byte_array:
+            crc = zlib.crc32(byte_array, crc)
+            byte_array = bf.read(block_size)
+    return crc
+
+
+def _scan_blocks(path, block_size):
+    crc = 0
+    with BlockReader(path, block_size) as reader:
+        for _, block in reader.blocks():  # zlib reads the memoryview directly, no copy
+            crc = zlib.crc32(block, crc)
+    return crc
+
+
+def _random_read(path, offsets, size):
+    total = 0
+    with open(path, 'rb') as bf:
+        for offset in offsets:
+            bf.seek(offset)
+            total += len(bf.read(size))
+    return total
+
+
+def _random_view(path, offsets, size):
+    total = 0
+    with BlockReader(path, size) as reader:
+        for offset in offsets:
+            total += len(reader.view(offset, size))
+    return total
+
+
+def _random_pread(path, offsets, size):
+    total = 0
+    with BlockReader(path, size) as reader:
+        for offset in offsets:
+            total += len(reader.pread(size, offset))
+    return total
+
+
+if __name__ == '__main__':
+    import random
+    import sys
+    import tempfile
+    import time
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 256 << 20  # bytes
+    block_size = DEFAULT_BLOCK_SIZE
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'testb.bin')
+        with open(path, 'wb') as stream:
+            data = bytearray(os.urandom(1 << 20))
+            for _ in range(size >> 20):
+                stream.write(data)
+
+        print('sequential scan of', size >> 20, 'MiB, blocks of', block_size, 'bytes')
+        for label, func in [('read()', _scan_read_all), ('read(block) loop', _scan_read),
+                            ('BlockReader.blocks', _scan_blocks)]:
+            start = time.perf_counter()
+            result = func(path, block_size)
+            elapsed = time.perf_counter() - start
+            print('  {:<20} {:>7.3f} s  {:>8.1f} MB/s  crc={:08x}'.format(label, elapsed, size / elapsed / 1e6, result))
+
+        random.seed(0)
+        offsets = [random.randrange(0, size - 10) for _ in range(200000)]
+        print('random reads of 10 bytes at', len(offsets), 'offsets')
+        for label, func in [('seek + read(10)', _random_read), ('BlockReader.view', _random_view),
+                            ('BlockReader.pread', _random_pread)]:
+            start = time.perf_counter()
+            result = func(path, offsets, 10)
+            elapsed = time.perf_counter() - start
+            print('  {:<20} {:>7.3f} s  {:>8.0f} reads/s'.format(label, elapsed, len(offsets) / elapsed))
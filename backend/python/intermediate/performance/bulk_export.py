@@ -0,0 +1,253 @@
+# ======== STREAMING BULK EXPORT ========= #
+
+"""
+Module 3 turns one object into text per print call:
+
+    class Teacher:
+        def __str__(self):
+            return 'Object : ' + self.name
+
+    print(teacher1)
+    new_student.introduce()     # print('Hello i\'m a student, my name is', self.name, ...)
+
+For a million objects this is a million calls of __str__, of print and of write. export() streams a collection
+to CSV, JSON Lines, fixed-width text or str() lines:
+
+    with open('students.csv', 'w', newline='', buffering=1 << 20) as stream:
+        export(students, stream, 'csv')                 # header: name,age,grade
+    export_file(teachers, 'teachers.jsonl', 'jsonl')    # {"name": "ridi"}
+
+How:
+    - one formatter per class and fields in an export: the fields (argument fields, else the class attribute
+      export_fields, else the public __slots__ of the class, else the public attributes of the objects) and a row
+      template are found once. Objects of one class can have different attributes (dog1.color = 'red'): without
+      declared fields every chunk checks the layout of its objects (one C loop), a chunk mixing layouts is cut in
+      runs of one layout, each with its fields. The check reads the __dict__ of every object, which on Python 3.11+
+      creates it (the attributes were inline): declared fields (export_fields, fields=) skip it and are faster
+    - the objects go by chunks: each field is read for the whole chunk with map(attrgetter(field), chunk), each
+      column is encoded at once (JSON strings with the C encoder of the json module), then the rows are built by
+      C code (csv.writer.writerows, map(template.__mod__, rows)) and the chunk is written with one write call
+    - the file is opened with a big buffer (export_file)
+
+A collection can mix classes (Teacher and Student): consecutive objects of the same class share a chunk. CSV and
+fixed-width output have one header, so the classes (and layouts) must have the same fields: pass fields= to export
+the same columns from all the objects.
+
+Fixed-width columns are widths[field], else STR_WIDTH / NUMBER_WIDTH (or the length of the field name when longer).
+Text longer than its column is cut to it; a number is never cut, a value wider than its column raises ValueError.
+"""
+
+import csv
+import json
+from itertools import groupby, islice
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter
+
+CHUNK_SIZE = 10000  # objects formatted at once
+BUFFER_SIZE = 1 << 20
+FORMATS = ('csv', 'jsonl', 'fixed', 'str')
+STR_WIDTH = 20  # default fixed-width column of text values
+NUMBER_WIDTH = 8  # default fixed-width column of the other values
+
+
+def _public(names):
+    return tuple(name for name in names if not name.startswith('_'))
+
+
+def _declared_fields(cls):
+    """export_fields of the class, else its public __slots__ when its instances have no __dict__, else None"""
+    fields = getattr(cls, 'export_fields', None)
+    if fields is not None:
+        return tuple(fields)
+    slots = []
+    for klass in cls.__mro__[:-1]:  # object has no __slots__
+        if '__slots__' not in klass.__dict__:
+            return None  # the instances have a __dict__: their attributes can differ
+        names = klass.__dict__['__slots__']
+        slots.extend([names] if isinstance(names, str) else names)
+    return _public(name for name in slots if name not in ('__dict__', '__weakref__'))
+
+
+def _by_layout(chunk, fields):
+    """[(fields, objects)]: the chunk in runs of objects with the same public attributes (fields None: not declared)"""
+    if fields is not None:
+        return [(fields, chunk)]
+    layouts = set(map(tuple, map(vars, chunk)))  # attribute names of every object, in C
+    if len(layouts) == 1:
+        return [(_public(layouts.pop()), chunk)]
+    return [(_public(layout), list(run)) for layout, run in groupby(chunk, lambda obj: tuple(vars(obj)))]
+
+
+def _json_column(column):
+    """The JSON text of every value of the column, as json.dumps would write it"""
+    kinds = set(map(type, column))
+    if kinds == {str}:
+        return map(encode_basestring_ascii, column)  # C encoder, the one json.dumps uses by default
+    if kinds == {int}:
+        return map(int.__repr__, column)
+    return map(json.dumps, column)
+
+
+class _Formatter:
+    def __init__(self, kind, fields, widths=None):
+        self.kind = kind
+        self.fields = fields
+        self.getters = [attrgetter(field) for field in fields]
+        self.widths = widths or {}
+        self.template = None  # fixed: found with the first chunk (alignment depends on the values)
+        self.line_length = None  # fixed: length of a line whose values fit their columns
+        self.uncut = []
+        if kind == 'jsonl':
+            # '{"name": %s, "age": %s}\n', keys escaped for JSON and for the % operator
+            self.template = '{' + ', '.join(json.dumps(field).replace('%', '%%') + ': %s' for field in fields) + '}\n'
+
+    def columns(self, chunk):
+        return [list(map(getter, chunk)) for getter in self.getters]
+
+    def _fixed_templates(self, columns):
+        """(row template, header template): text cut to its column, the other values only padded"""
+        rows, headers, widths = [], [], []
+        self.uncut = []  # (index, width) of the columns that are not cut
+        for index, (field, column) in enumerate(zip(self.fields, columns)):
+            text = isinstance(column[0], str)
+            width = self.widths.get(field) or max(STR_WIDTH if text else NUMBER_WIDTH, len(field))
+            rows.append('%-{0}.{0}s'.format(width) if text else '%{}s'.format(width))
+            headers.append('%{}{}.{}s'.format('-' if text else '', width, width))
+            widths.append(width)
+            if not text:
+                self.uncut.append((index, width))
+        self.line_length = sum(widths) + len(widths)  # the separators and the newline
+        return ' '.join(rows) + '\n', ' '.join(headers) + '\n'
+
+    def _check_fixed(self, lines, columns):
+        if max(map(len, lines)) <= self.line_length:  # only a value wider than its column makes a line longer
+            return
+        for index, width in self.uncut:
+            for value in columns[index]:
+                if len(str(value)) > width:
+                    raise ValueError('{!r} is wider than the {} characters of the column {!r}, pass widths='.format(
+                        value, width, self.fields[index]))
+
+    def fixed_header(self, chunk):
+        """The field names, aligned like the values of chunk"""
+        if self.template is None:
+            self.template, self.header_template = self._fixed_templates(self.columns(chunk[:1]))
+        return self.header_template % self.fields
+
+    def format(self, chunk, stream, csv_writer):
+        if self.kind == 'str':
+            stream.write('\n'.join(map(str, chunk)) + '\n')
+            return
+        columns = self.columns(chunk)
+        if self.kind == 'csv':
+            csv_writer.writerows(zip(*columns))
+            return
+        if self.kind == 'jsonl':
+            stream.write(''.join(map(self.template.__mod__, zip(*map(_json_column, columns)))))
+            return
+        if self.template is None:
+            self.template, self.header_template = self._fixed_templates(columns)
+        lines = list(map(self.template.__mod__, zip(*columns)))
+        self._check_fixed(lines, columns)
+        stream.write(''.join(lines))
+
+
+def export(objects, stream, kind='csv', fields=None, header=True, widths=None, chunk_size=CHUNK_SIZE):
+    """Write objects to the text stream in kind format, return the number of objects"""
+    if kind not in FORMATS:
+        raise ValueError('unknown format {!r}, expected one of {}'.format(kind, FORMATS))
+    fields = None if fields is None else tuple(fields)
+    csv_writer = csv.writer(stream) if kind == 'csv' else None
+    count = 0
+    header_fields = None
+    formatters = {}  # (class, fields) -> _Formatter, for this export only: the layouts can change between exports
+    for cls, run in groupby(objects, type):
+        declared = fields if fields is not None else _declared_fields(cls)
+        chunk = list(islice(run, chunk_size))
+        while chunk:
+            for run_fields, objects_run in _by_layout(chunk, declared) if kind != 'str' else [((), chunk)]:
+                formatter = formatters.get((cls, run_fields))
+                if formatter is None:
+                    formatter = formatters[cls, run_fields] = _Formatter(kind, run_fields, widths)
+                if header_fields is None:
+                    header_fields = formatter.fields
+                    if header and kind == 'csv':
+                        csv_writer.writerow(header_fields)
+                    elif header and kind == 'fixed':
+                        stream.write(formatter.fixed_header(objects_run))
+                elif kind in ('csv', 'fixed') and formatter.fields != header_fields:
+                    raise ValueError('{} objects with the fields {}, the file has {}: pass fields='.format(
+                        cls.__name__, formatter.fields, header_fields))
+                formatter.format(objects_run, stream, csv_writer)
+            count += len(chunk)
+            chunk = list(islice(run, chunk_size))
+    return count
+
+
+def export_file(objects, path, kind='csv', fields=None, header=True, widths=None, chunk_size=CHUNK_SIZE,
+                encoding='utf-8'):
+    with open(path, 'w', newline='', encoding=encoding, buffering=BUFFER_SIZE) as stream:
+        return export(objects, stream, kind, fields, header, widths, chunk_size)
+
+
+# ======= BENCHMARK ======= #
+
+class Teacher:  # Module 3
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return 'Object : ' + self.name
+
+
+class Student:  # Module 3
+    def __init__(self, s_name, s_age, s_grade):
+        self.name = s_name
+        self.age = s_age
+        self.grade = s_grade
+
+    def __str__(self):
+        return 'Hello i\'m a student, my name is {} my grade is {} and i\'m {}'.format(self.name, self.grade,
+                                                                                       self.age)
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    import tempfile
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    students = [Student('student "{}"'.format(i), 18 + i % 10, i % 20) for i in range(count)]
+    teachers = [Teacher('teacher{}'.format(i)) for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'out')
+
+        def run(label, func):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            print('  {:<44} {:>7.2f} s  {:>10.0f} objects/s  {:>7.1f} MB'.format(
+                label, elapsed, count / elapsed, os.path.getsize(path) / 1e6))
+
+        def print_loop(objects, buffering):
+            with open(path, 'w', buffering=buffering) as stream:
+                for obj in objects:
+                    print(obj, file=stream)
+
+        for name, objects in [('Student', students), ('Teacher', teachers)]:
+            print('{} {} objects'.format(count, name))
+            run('print(obj) loop, line buffered (terminal)', lambda: print_loop(objects, 1))
+            run('print(obj) loop, default buffer', lambda: print_loop(objects, -1))
+            for kind in FORMATS:
+                run("export_file(..., '{}')".format(kind), lambda: export_file(objects, path, kind))
+            fields = tuple(vars(objects[0]))
+            run("export_file(..., 'csv', fields=...)", lambda: export_file(objects, path, 'csv', fields))
+
+        export_file(students[:3], path, 'jsonl')
+        with open(path) as stream:
+            assert [json.loads(line) for line in stream] == [vars(s) for s in students[:3]]
+        export_file(students[:3], path, 'csv')
+        with open(path, newline='') as stream:
+            assert list(csv.reader(stream))[1] == [students[0].name, '18', '0']
@@ -0,0 +1,175 @@
+# ======== VECTORIZED CAR FLEET ========= #
+
+"""
+Car of Module 3 (encapsulation) changes the speed of one object per call. CarFleet keeps the speed of every car
+in one NumPy array and applies speed_up / speed_down to a whole selection of cars (a boolean mask or an array of
+indexes) with a few NumPy operations, with the same rules as Car:
+    - a negative initial speed becomes 0
+    - speed_up adds 5
+    - speed_down removes 5, and a speed under 5 becomes 0
+
+fleet[i] returns a CarView: a Car whose private speed lives in the fleet array, so the methods of Car work on it
+unchanged and every change is visible in the fleet (and the other way around).
+
+Needs numpy (pip install numpy).
+"""
+
+import numpy as np
+
+SPEED_STEP = 5
+
+
+class Car:  # same as Module 3
+    def __init__(self, model, color, initial_speed=0):
+        self.model = model
+        self.color = color
+        if initial_speed < 0:
+            self.__speed = 0  # Private attribute
+        else:
+            self.__speed = initial_speed
+
+    def speed_up(self):
+        self.__speed += 5
+
+    def speed_down(self):
+        if self.__speed < 5:
+            self.__speed = 0
+        else:
+            self.__speed -= 5
+
+    def show_speed(self):
+        print('The current speed is', self.__speed)
+
+
+class CarView(Car):
+    """One car of a CarFleet. Car methods read and write self._Car__speed, which is redirected to the fleet array"""
+
+    def __init__(self, fleet, index):  # Car.__init__ is not called, the state already exists in the fleet
+        self._fleet = fleet
+        self._index = index
+
+    @property
+    def model(self):
+        return self._fleet.models[self._index]
+
+    @property
+    def color(self):
+        return self._fleet.colors[self._index]
+
+    @property
+    def _Car__speed(self):  # name mangled form of the private __speed of Car
+        return int(self._fleet.speeds[self._index])
+
+    @_Car__speed.setter
+    def _Car__speed(self, value):
+        self._fleet.speeds[self._index] = value
+
+
+class CarFleet:
+    def __init__(self, models, colors, initial_speeds=None, dtype=np.int64):
+        if len(models) != len(colors):
+            raise ValueError('models and colors must have the same length')
+        self.models = models
+        self.colors = colors
+        if initial_speeds is None:
+            self.speeds = np.zeros(len(models), dtype=dtype)
+        else:
+            self.speeds = np.array(initial_speeds, dtype=dtype)  # copy, the fleet owns its speeds
+            if self.speeds.shape != (len(models),):
+                raise ValueError('initial_speeds must have one value per car')
+            np.maximum(self.speeds, 0, out=self.speeds)  # same rule as Car.__init__: negative speed -> 0
+
+    @classmethod
+    def from_cars(cls, cars):
+        cars = list(cars)
+        return cls([car.model for car in cars], [car.color for car in cars],
+                   [car._Car__speed for car in cars])
+
+    def __len__(self):
+        return len(self.speeds)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('CarFleet index out of range')
+        return CarView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield CarView(self, index)
+
+    def _selection(self, selection):
+        if selection is None:
+            return None
+        selection = np.asarray(selection)
+        if selection.dtype == np.bool_:
+            if selection.shape != self.speeds.shape:
+                raise ValueError('the mask must have one value per car')
+            return selection
+        mask = np.zeros(len(self), dtype=np.bool_)  # indexes -> mask, a repeated index still moves the car once
+        mask[selection] = True
+        return mask
+
+    def speed_up(self, selection=None):
+        """speed_up() of every selected car (all cars when selection is None)"""
+        mask = self._selection(selection)
+        if mask is None:
+            self.speeds += SPEED_STEP
+        else:
+            # branch free: adding 5 * mask is faster than a masked add (where=) on a random mask
+            self.speeds += mask * self.speeds.dtype.type(SPEED_STEP)
+
+    def speed_down(self, selection=None):
+        """speed_down() of every selected car: speed - 5, never under 0"""
+        mask = self._selection(selection)
+        if mask is None:
+            self.speeds -= SPEED_STEP
+            np.maximum(self.speeds, 0, out=self.speeds)
+        else:
+            step = mask * self.speeds.dtype.type(SPEED_STEP)  # 5 for selected cars, 0 for the others
+            np.minimum(self.speeds, step, out=step)  # never remove more than the current speed
+            self.speeds -= step
+
+    def show_speed(self, index):
+        self[index].show_speed()
+
+
+# ======= BENCHMARK ======= #
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    per_car_count = min(count, 200000)
+    rng = np.random.default_rng(0)
+    initial = rng.integers(-10, 120, count)
+
+    cars = [Car('tucson', 'silver', int(speed)) for speed in initial[:per_car_count]]
+    start = time.perf_counter()
+    for car in cars:
+        car.speed_up()
+    for car in cars:
+        car.speed_down()
+    per_car = (time.perf_counter() - start) / per_car_count / 2
+    print('Car objects:   {:.1f} ns per car per step -> {:.2f} s per step for {} cars'.format(
+        per_car * 1e9, per_car * count, count))
+
+    fleet = CarFleet(['tucson'] * count, ['silver'] * count, initial)
+    mask = rng.random(count) < 0.5
+    for label, step in [('speed_up all', lambda: fleet.speed_up()),
+                        ('speed_down all', lambda: fleet.speed_down()),
+                        ('speed_up mask', lambda: fleet.speed_up(mask)),
+                        ('speed_down mask', lambda: fleet.speed_down(mask))]:
+        start = time.perf_counter()
+        for _ in range(10):
+            step()
+        elapsed = (time.perf_counter() - start) / 10
+        print('CarFleet {:<16} {:.4f} s per step ({:.2f} ns per car)'.format(label, elapsed, elapsed / count * 1e9))
+
+    # the fleet and Car objects agree
+    for car, view in zip(cars[:1000], CarFleet.from_cars(cars[:1000])):
+        car.speed_down()
+        view.speed_down()
+        assert car._Car__speed == view._Car__speed
@@ -0,0 +1,192 @@
+# ======== CHUNKED CHARACTER / LINE COUNTER ========= #
+
+"""
+Replacement for the read(1) loop of Module 4 (File Processing):
+
+    character = stream.read(1)
+    while character != '':
+        counter += 1
+        character = stream.read(1)
+
+That loop does one Python call per character. Here the file is read in big chunks (or through mmap) and each chunk is
+handed to C code (decode, len, count), so the Python loop only runs once per chunk.
+
+The counts are the same ones the text-mode loops of Module 4 give (open() with universal newlines):
+    - chars : what read(1) would count, '\\r\\n' is one character ('\\n')
+    - lines : what readline() / for line in stream would count
+    - bytes : size of the raw file
+"""
+
+import codecs
+import mmap
+import os
+from collections import namedtuple
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+Counts = namedtuple('Counts', ['chars', 'lines', 'bytes'])
+
+# every byte that is NOT a utf-8 continuation byte (0b10xxxxxx) starts a new character
+_UTF8_CONTINUATION = bytes(range(0x80, 0xC0))
+
+
+def _iter_chunks(stream, chunk_size):
+    chunk = stream.read(chunk_size)
+    while chunk:
+        yield chunk
+        chunk = stream.read(chunk_size)
+
+
+def _iter_mmap_chunks(stream, chunk_size):
+    if os.fstat(stream.fileno()).st_size == 0:  # mmap can't map an empty file
+        return
+    with mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for start in range(0, len(mm), chunk_size):
+            yield mm[start:start + chunk_size]
+
+
+class _LineState:
+    """Carry the newline state from one chunk to the next
+
+    A '\\r' at the end of a chunk and a '\\n' at the start of the next one are one line end.
+    """
+
+    def __init__(self, cr, lf):
+        self.cr = cr
+        self.lf = lf
+        self.lines = 0
+        self.crlf = 0
+        self.ends_with_cr = False
+        self.last = None  # last character seen
+
+    def feed(self, chunk):
+        if not chunk:
+            return
+        if self.ends_with_cr and chunk[:1] == self.lf:
+            self.crlf += 1
+        self.crlf += chunk.count(self.cr + self.lf)
+        self.lines += chunk.count(self.lf) + chunk.count(self.cr)
+        self.ends_with_cr = chunk[-1:] == self.cr
+        self.last = chunk[-1:]
+
+    def total_lines(self):
+        lines = self.lines - self.crlf  # '\r\n' is only one line ending
+        if self.last is not None and self.last not in (self.cr, self.lf):
+            lines += 1  # last line without line ending
+        return lines
+
+
+def count_stream(stream, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8', errors='strict', validate=True,
+                 use_mmap=False):
+    """Count characters, lines and bytes of a binary stream in one pass"""
+    if chunk_size <= 0:
+        raise ValueError('chunk_size must be positive')
+    chunks = _iter_mmap_chunks(stream, chunk_size) if use_mmap else _iter_chunks(stream, chunk_size)
+    n_bytes = 0
+
+    if not validate and codecs.lookup(encoding).name == 'utf-8':
+        # fast path: no decoding at all, count the lead bytes. A multi-byte character split between two chunks
+        # is still counted once because only its first byte is a lead byte.
+        state = _LineState(b'\r', b'\n')
+        chars = 0
+        for chunk in chunks:
+            n_bytes += len(chunk)
+            chars += len(chunk.translate(None, _UTF8_CONTINUATION))
+            state.feed(chunk)
+        return Counts(chars - state.crlf, state.total_lines(), n_bytes)
+
+    # general path: the incremental decoder keeps the incomplete multi-byte sequence at the end of a chunk
+    # and finishes it with the first bytes of the next one
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    state = _LineState('\r', '\n')
+    chars = 0
+    for chunk in chunks:
+        n_bytes += len(chunk)
+        text = decoder.decode(chunk)
+        chars += len(text)
+        state.feed(text)
+    text = decoder.decode(b'', final=True)  # raise on a truncated sequence at the end of the file
+    chars += len(text)
+    state.feed(text)
+    return Counts(chars - state.crlf, state.total_lines(), n_bytes)
+
+
+def count_file(path, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8', errors='strict', validate=True,
+               use_mmap=False):
+    """Count characters, lines and bytes of the file at path (see count_stream)"""
+    with open(path, 'rb') as stream:
+        return count_stream(stream, chunk_size, encoding, errors, validate, use_mmap)
+
+
+# ======= BENCHMARK ======= #
+
+def _read_one(path):
+    counter = 0
+    with open(path, encoding='utf-8') as stream:
+        character = stream.read(1)
+        while character != '':
+            counter += 1
+            character = stream.read(1)
+    return counter
+
+
+def _readline(path):
+    counter_l = 0
+    with open(path, encoding='utf-8') as stream:
+        line = stream.readline()
+        while line != '':
+            counter_l += 1
+            line = stream.readline()
+    return counter_l
+
+
+def _readlines_2(path):
+    counter_l = 0
+    with open(path, encoding='utf-8') as stream:
+        lines = stream.readlines(2)
+        while len(lines) != 0:
+            counter_l += len(lines)
+            lines = stream.readlines(2)
+    return counter_l
+
+
+def _for_line(path):
+    counter_l = 0
+    with open(path, encoding='utf-8') as stream:
+        for _ in stream:
+            counter_l += 1
+    return counter_l
+
+
+def _write_sample(path, size):
+    line = 'hello world, été ok ✓ ' * 3 + '\n'
+    with open(path, 'w', encoding='utf-8') as stream:
+        for _ in range(size // len(line.encode('utf-8')) + 1):
+            stream.write(line)
+
+
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    import time
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 8 << 20  # bytes, pass a bigger size to test more
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'fileprocessingtest')
+        _write_sample(path, size)
+        print('file size:', os.path.getsize(path), 'bytes')
+
+        candidates = [
+            ('read(1) loop', _read_one),
+            ('readline() loop', _readline),
+            ('readlines(2) loop', _readlines_2),
+            ('for line in stream', _for_line),
+            ('count_file', count_file),
+            ('count_file mmap', lambda p: count_file(p, use_mmap=True)),
+            ('count_file no validation', lambda p: count_file(p, validate=False)),
+        ]
+        for label, func in candidates:
+            start = time.perf_counter()
+            result = func(path)
+            elapsed = time.perf_counter() - start
+            print('{:<26} {:>8.3f} s  {:>8.1f} MB/s  {}'.format(label, elapsed, size / elapsed / 1e6, result))
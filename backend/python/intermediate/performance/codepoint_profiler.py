@@ -0,0 +1,578 @@
+# ======== UNICODE CODE POINT PROFILER ========= #
+
+"""
+Module 2: every character has a code point, ord('a') == 97, chr(97) == 'a', min('abc') / max('abc') compare code
+points, and UTF-8 stores ASCII (code points 0 - 127) in one byte and the others in 2 to 4 bytes.
+
+profile_file / profile_stream read a big file as raw bytes, chunk by chunk, and report:
+    - number of characters and bytes, percent of ASCII characters
+    - min / max code point
+    - histogram by Unicode block (Basic Latin, Latin-1 Supplement, Cyrillic, Hiragana ... all the 320 blocks)
+    - byte ranges that are not valid UTF-8
+
+Instead of ord() on every character:
+    - a pure ASCII chunk (bytes.isascii, one C call) is never decoded: min / max of the bytes are the code points,
+      and every byte is one 'Basic Latin' character
+    - other chunks are decoded with codecs.utf_8_decode, which stops before an incomplete sequence at the end of the
+      chunk (kept for the next chunk); an error handler records the position of every invalid byte sequence and
+      drops it, so a chunk is decoded in one call however many invalid bytes it has
+    - the block histogram of a decoded chunk is computed on all its code points at once: with numpy
+      (searchsorted + bincount) when it is installed, otherwise with a sorted array and bisect
+"""
+
+import codecs
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # optional, only makes the histogram of non-ASCII chunks faster
+    np = None
+
+CHUNK_SIZE = 1 << 20
+MAX_INVALID = 1000  # invalid ranges kept in the report (all are counted)
+
+# (first code point, name) of every Unicode block, sorted, from Blocks.txt of Unicode 14.0 (the unicodedata of Python
+# 3.11), with the gaps between blocks as 'No block'. A code point belongs to the last block starting at or before it.
+BLOCKS = [
+    (0x0000, 'Basic Latin'),
+    (0x0080, 'Latin-1 Supplement'),
+    (0x0100, 'Latin Extended-A'),
+    (0x0180, 'Latin Extended-B'),
+    (0x0250, 'IPA Extensions'),
+    (0x02B0, 'Spacing Modifier Letters'),
+    (0x0300, 'Combining Diacritical Marks'),
+    (0x0370, 'Greek and Coptic'),
+    (0x0400, 'Cyrillic'),
+    (0x0500, 'Cyrillic Supplement'),
+    (0x0530, 'Armenian'),
+    (0x0590, 'Hebrew'),
+    (0x0600, 'Arabic'),
+    (0x0700, 'Syriac'),
+    (0x0750, 'Arabic Supplement'),
+    (0x0780, 'Thaana'),
+    (0x07C0, 'NKo'),
+    (0x0800, 'Samaritan'),
+    (0x0840, 'Mandaic'),
+    (0x0860, 'Syriac Supplement'),
+    (0x0870, 'Arabic Extended-B'),
+    (0x08A0, 'Arabic Extended-A'),
+    (0x0900, 'Devanagari'),
+    (0x0980, 'Bengali'),
+    (0x0A00, 'Gurmukhi'),
+    (0x0A80, 'Gujarati'),
+    (0x0B00, 'Oriya'),
+    (0x0B80, 'Tamil'),
+    (0x0C00, 'Telugu'),
+    (0x0C80, 'Kannada'),
+    (0x0D00, 'Malayalam'),
+    (0x0D80, 'Sinhala'),
+    (0x0E00, 'Thai'),
+    (0x0E80, 'Lao'),
+    (0x0F00, 'Tibetan'),
+    (0x1000, 'Myanmar'),
+    (0x10A0, 'Georgian'),
+    (0x1100, 'Hangul Jamo'),
+    (0x1200, 'Ethiopic'),
+    (0x1380, 'Ethiopic Supplement'),
+    (0x13A0, 'Cherokee'),
+    (0x1400, 'Unified Canadian Aboriginal Syllabics'),
+    (0x1680, 'Ogham'),
+    (0x16A0, 'Runic'),
+    (0x1700, 'Tagalog'),
+    (0x1720, 'Hanunoo'),
+    (0x1740, 'Buhid'),
+    (0x1760, 'Tagbanwa'),
+    (0x1780, 'Khmer'),
+    (0x1800, 'Mongolian'),
+    (0x18B0, 'Unified Canadian Aboriginal Syllabics Extended'),
+    (0x1900, 'Limbu'),
+    (0x1950, 'Tai Le'),
+    (0x1980, 'New Tai Lue'),
+    (0x19E0, 'Khmer Symbols'),
+    (0x1A00, 'Buginese'),
+    (0x1A20, 'Tai Tham'),
+    (0x1AB0, 'Combining Diacritical Marks Extended'),
+    (0x1B00, 'Balinese'),
+    (0x1B80, 'Sundanese'),
+    (0x1BC0, 'Batak'),
+    (0x1C00, 'Lepcha'),
+    (0x1C50, 'Ol Chiki'),
+    (0x1C80, 'Cyrillic Extended-C'),
+    (0x1C90, 'Georgian Extended'),
+    (0x1CC0, 'Sundanese Supplement'),
+    (0x1CD0, 'Vedic Extensions'),
+    (0x1D00, 'Phonetic Extensions'),
+    (0x1D80, 'Phonetic Extensions Supplement'),
+    (0x1DC0, 'Combining Diacritical Marks Supplement'),
+    (0x1E00, 'Latin Extended Additional'),
+    (0x1F00, 'Greek Extended'),
+    (0x2000, 'General Punctuation'),
+    (0x2070, 'Superscripts and Subscripts'),
+    (0x20A0, 'Currency Symbols'),
+    (0x20D0, 'Combining Diacritical Marks for Symbols'),
+    (0x2100, 'Letterlike Symbols'),
+    (0x2150, 'Number Forms'),
+    (0x2190, 'Arrows'),
+    (0x2200, 'Mathematical Operators'),
+    (0x2300, 'Miscellaneous Technical'),
+    (0x2400, 'Control Pictures'),
+    (0x2440, 'Optical Character Recognition'),
+    (0x2460, 'Enclosed Alphanumerics'),
+    (0x2500, 'Box Drawing'),
+    (0x2580, 'Block Elements'),
+    (0x25A0, 'Geometric Shapes'),
+    (0x2600, 'Miscellaneous Symbols'),
+    (0x2700, 'Dingbats'),
+    (0x27C0, 'Miscellaneous Mathematical Symbols-A'),
+    (0x27F0, 'Supplemental Arrows-A'),
+    (0x2800, 'Braille Patterns'),
+    (0x2900, 'Supplemental Arrows-B'),
+    (0x2980, 'Miscellaneous Mathematical Symbols-B'),
+    (0x2A00, 'Supplemental Mathematical Operators'),
+    (0x2B00, 'Miscellaneous Symbols and Arrows'),
+    (0x2C00, 'Glagolitic'),
+    (0x2C60, 'Latin Extended-C'),
+    (0x2C80, 'Coptic'),
+    (0x2D00, 'Georgian Supplement'),
+    (0x2D30, 'Tifinagh'),
+    (0x2D80, 'Ethiopic Extended'),
+    (0x2DE0, 'Cyrillic Extended-A'),
+    (0x2E00, 'Supplemental Punctuation'),
+    (0x2E80, 'CJK Radicals Supplement'),
+    (0x2F00, 'Kangxi Radicals'),
+    (0x2FE0, 'No block'),
+    (0x2FF0, 'Ideographic Description Characters'),
+    (0x3000, 'CJK Symbols and Punctuation'),
+    (0x3040, 'Hiragana'),
+    (0x30A0, 'Katakana'),
+    (0x3100, 'Bopomofo'),
+    (0x3130, 'Hangul Compatibility Jamo'),
+    (0x3190, 'Kanbun'),
+    (0x31A0, 'Bopomofo Extended'),
+    (0x31C0, 'CJK Strokes'),
+    (0x31F0, 'Katakana Phonetic Extensions'),
+    (0x3200, 'Enclosed CJK Letters and Months'),
+    (0x3300, 'CJK Compatibility'),
+    (0x3400, 'CJK Unified Ideographs Extension A'),
+    (0x4DC0, 'Yijing Hexagram Symbols'),
+    (0x4E00, 'CJK Unified Ideographs'),
+    (0xA000, 'Yi Syllables'),
+    (0xA490, 'Yi Radicals'),
+    (0xA4D0, 'Lisu'),
+    (0xA500, 'Vai'),
+    (0xA640, 'Cyrillic Extended-B'),
+    (0xA6A0, 'Bamum'),
+    (0xA700, 'Modifier Tone Letters'),
+    (0xA720, 'Latin Extended-D'),
+    (0xA800, 'Syloti Nagri'),
+    (0xA830, 'Common Indic Number Forms'),
+    (0xA840, 'Phags-pa'),
+    (0xA880, 'Saurashtra'),
+    (0xA8E0, 'Devanagari Extended'),
+    (0xA900, 'Kayah Li'),
+    (0xA930, 'Rejang'),
+    (0xA960, 'Hangul Jamo Extended-A'),
+    (0xA980, 'Javanese'),
+    (0xA9E0, 'Myanmar Extended-B'),
+    (0xAA00, 'Cham'),
+    (0xAA60, 'Myanmar Extended-A'),
+    (0xAA80, 'Tai Viet'),
+    (0xAAE0, 'Meetei Mayek Extensions'),
+    (0xAB00, 'Ethiopic Extended-A'),
+    (0xAB30, 'Latin Extended-E'),
+    (0xAB70, 'Cherokee Supplement'),
+    (0xABC0, 'Meetei Mayek'),
+    (0xAC00, 'Hangul Syllables'),
+    (0xD7B0, 'Hangul Jamo Extended-B'),
+    (0xD800, 'High Surrogates'),
+    (0xDB80, 'High Private Use Surrogates'),
+    (0xDC00, 'Low Surrogates'),
+    (0xE000, 'Private Use Area'),
+    (0xF900, 'CJK Compatibility Ideographs'),
+    (0xFB00, 'Alphabetic Presentation Forms'),
+    (0xFB50, 'Arabic Presentation Forms-A'),
+    (0xFE00, 'Variation Selectors'),
+    (0xFE10, 'Vertical Forms'),
+    (0xFE20, 'Combining Half Marks'),
+    (0xFE30, 'CJK Compatibility Forms'),
+    (0xFE50, 'Small Form Variants'),
+    (0xFE70, 'Arabic Presentation Forms-B'),
+    (0xFF00, 'Halfwidth and Fullwidth Forms'),
+    (0xFFF0, 'Specials'),
+    (0x10000, 'Linear B Syllabary'),
+    (0x10080, 'Linear B Ideograms'),
+    (0x10100, 'Aegean Numbers'),
+    (0x10140, 'Ancient Greek Numbers'),
+    (0x10190, 'Ancient Symbols'),
+    (0x101D0, 'Phaistos Disc'),
+    (0x10200, 'No block'),
+    (0x10280, 'Lycian'),
+    (0x102A0, 'Carian'),
+    (0x102E0, 'Coptic Epact Numbers'),
+    (0x10300, 'Old Italic'),
+    (0x10330, 'Gothic'),
+    (0x10350, 'Old Permic'),
+    (0x10380, 'Ugaritic'),
+    (0x103A0, 'Old Persian'),
+    (0x103E0, 'No block'),
+    (0x10400, 'Deseret'),
+    (0x10450, 'Shavian'),
+    (0x10480, 'Osmanya'),
+    (0x104B0, 'Osage'),
+    (0x10500, 'Elbasan'),
+    (0x10530, 'Caucasian Albanian'),
+    (0x10570, 'Vithkuqi'),
+    (0x105C0, 'No block'),
+    (0x10600, 'Linear A'),
+    (0x10780, 'Latin Extended-F'),
+    (0x107C0, 'No block'),
+    (0x10800, 'Cypriot Syllabary'),
+    (0x10840, 'Imperial Aramaic'),
+    (0x10860, 'Palmyrene'),
+    (0x10880, 'Nabataean'),
+    (0x108B0, 'No block'),
+    (0x108E0, 'Hatran'),
+    (0x10900, 'Phoenician'),
+    (0x10920, 'Lydian'),
+    (0x10940, 'No block'),
+    (0x10980, 'Meroitic Hieroglyphs'),
+    (0x109A0, 'Meroitic Cursive'),
+    (0x10A00, 'Kharoshthi'),
+    (0x10A60, 'Old South Arabian'),
+    (0x10A80, 'Old North Arabian'),
+    (0x10AA0, 'No block'),
+    (0x10AC0, 'Manichaean'),
+    (0x10B00, 'Avestan'),
+    (0x10B40, 'Inscriptional Parthian'),
+    (0x10B60, 'Inscriptional Pahlavi'),
+    (0x10B80, 'Psalter Pahlavi'),
+    (0x10BB0, 'No block'),
+    (0x10C00, 'Old Turkic'),
+    (0x10C50, 'No block'),
+    (0x10C80, 'Old Hungarian'),
+    (0x10D00, 'Hanifi Rohingya'),
+    (0x10D40, 'No block'),
+    (0x10E60, 'Rumi Numeral Symbols'),
+    (0x10E80, 'Yezidi'),
+    (0x10EC0, 'No block'),
+    (0x10F00, 'Old Sogdian'),
+    (0x10F30, 'Sogdian'),
+    (0x10F70, 'Old Uyghur'),
+    (0x10FB0, 'Chorasmian'),
+    (0x10FE0, 'Elymaic'),
+    (0x11000, 'Brahmi'),
+    (0x11080, 'Kaithi'),
+    (0x110D0, 'Sora Sompeng'),
+    (0x11100, 'Chakma'),
+    (0x11150, 'Mahajani'),
+    (0x11180, 'Sharada'),
+    (0x111E0, 'Sinhala Archaic Numbers'),
+    (0x11200, 'Khojki'),
+    (0x11250, 'No block'),
+    (0x11280, 'Multani'),
+    (0x112B0, 'Khudawadi'),
+    (0x11300, 'Grantha'),
+    (0x11380, 'No block'),
+    (0x11400, 'Newa'),
+    (0x11480, 'Tirhuta'),
+    (0x114E0, 'No block'),
+    (0x11580, 'Siddham'),
+    (0x11600, 'Modi'),
+    (0x11660, 'Mongolian Supplement'),
+    (0x11680, 'Takri'),
+    (0x116D0, 'No block'),
+    (0x11700, 'Ahom'),
+    (0x11750, 'No block'),
+    (0x11800, 'Dogra'),
+    (0x11850, 'No block'),
+    (0x118A0, 'Warang Citi'),
+    (0x11900, 'Dives Akuru'),
+    (0x11960, 'No block'),
+    (0x119A0, 'Nandinagari'),
+    (0x11A00, 'Zanabazar Square'),
+    (0x11A50, 'Soyombo'),
+    (0x11AB0, 'Unified Canadian Aboriginal Syllabics Extended-A'),
+    (0x11AC0, 'Pau Cin Hau'),
+    (0x11B00, 'No block'),
+    (0x11C00, 'Bhaiksuki'),
+    (0x11C70, 'Marchen'),
+    (0x11CC0, 'No block'),
+    (0x11D00, 'Masaram Gondi'),
+    (0x11D60, 'Gunjala Gondi'),
+    (0x11DB0, 'No block'),
+    (0x11EE0, 'Makasar'),
+    (0x11F00, 'No block'),
+    (0x11FB0, 'Lisu Supplement'),
+    (0x11FC0, 'Tamil Supplement'),
+    (0x12000, 'Cuneiform'),
+    (0x12400, 'Cuneiform Numbers and Punctuation'),
+    (0x12480, 'Early Dynastic Cuneiform'),
+    (0x12550, 'No block'),
+    (0x12F90, 'Cypro-Minoan'),
+    (0x13000, 'Egyptian Hieroglyphs'),
+    (0x13430, 'Egyptian Hieroglyph Format Controls'),
+    (0x13440, 'No block'),
+    (0x14400, 'Anatolian Hieroglyphs'),
+    (0x14680, 'No block'),
+    (0x16800, 'Bamum Supplement'),
+    (0x16A40, 'Mro'),
+    (0x16A70, 'Tangsa'),
+    (0x16AD0, 'Bassa Vah'),
+    (0x16B00, 'Pahawh Hmong'),
+    (0x16B90, 'No block'),
+    (0x16E40, 'Medefaidrin'),
+    (0x16EA0, 'No block'),
+    (0x16F00, 'Miao'),
+    (0x16FA0, 'No block'),
+    (0x16FE0, 'Ideographic Symbols and Punctuation'),
+    (0x17000, 'Tangut'),
+    (0x18800, 'Tangut Components'),
+    (0x18B00, 'Khitan Small Script'),
+    (0x18D00, 'Tangut Supplement'),
+    (0x18D80, 'No block'),
+    (0x1AFF0, 'Kana Extended-B'),
+    (0x1B000, 'Kana Supplement'),
+    (0x1B100, 'Kana Extended-A'),
+    (0x1B130, 'Small Kana Extension'),
+    (0x1B170, 'Nushu'),
+    (0x1B300, 'No block'),
+    (0x1BC00, 'Duployan'),
+    (0x1BCA0, 'Shorthand Format Controls'),
+    (0x1BCB0, 'No block'),
+    (0x1CF00, 'Znamenny Musical Notation'),
+    (0x1CFD0, 'No block'),
+    (0x1D000, 'Byzantine Musical Symbols'),
+    (0x1D100, 'Musical Symbols'),
+    (0x1D200, 'Ancient Greek Musical Notation'),
+    (0x1D250, 'No block'),
+    (0x1D2E0, 'Mayan Numerals'),
+    (0x1D300, 'Tai Xuan Jing Symbols'),
+    (0x1D360, 'Counting Rod Numerals'),
+    (0x1D380, 'No block'),
+    (0x1D400, 'Mathematical Alphanumeric Symbols'),
+    (0x1D800, 'Sutton SignWriting'),
+    (0x1DAB0, 'No block'),
+    (0x1DF00, 'Latin Extended-G'),
+    (0x1E000, 'Glagolitic Supplement'),
+    (0x1E030, 'No block'),
+    (0x1E100, 'Nyiakeng Puachue Hmong'),
+    (0x1E150, 'No block'),
+    (0x1E290, 'Toto'),
+    (0x1E2C0, 'Wancho'),
+    (0x1E300, 'No block'),
+    (0x1E7E0, 'Ethiopic Extended-B'),
+    (0x1E800, 'Mende Kikakui'),
+    (0x1E8E0, 'No block'),
+    (0x1E900, 'Adlam'),
+    (0x1E960, 'No block'),
+    (0x1EC70, 'Indic Siyaq Numbers'),
+    (0x1ECC0, 'No block'),
+    (0x1ED00, 'Ottoman Siyaq Numbers'),
+    (0x1ED50, 'No block'),
+    (0x1EE00, 'Arabic Mathematical Alphabetic Symbols'),
+    (0x1EF00, 'No block'),
+    (0x1F000, 'Mahjong Tiles'),
+    (0x1F030, 'Domino Tiles'),
+    (0x1F0A0, 'Playing Cards'),
+    (0x1F100, 'Enclosed Alphanumeric Supplement'),
+    (0x1F200, 'Enclosed Ideographic Supplement'),
+    (0x1F300, 'Miscellaneous Symbols and Pictographs'),
+    (0x1F600, 'Emoticons'),
+    (0x1F650, 'Ornamental Dingbats'),
+    (0x1F680, 'Transport and Map Symbols'),
+    (0x1F700, 'Alchemical Symbols'),
+    (0x1F780, 'Geometric Shapes Extended'),
+    (0x1F800, 'Supplemental Arrows-C'),
+    (0x1F900, 'Supplemental Symbols and Pictographs'),
+    (0x1FA00, 'Chess Symbols'),
+    (0x1FA70, 'Symbols and Pictographs Extended-A'),
+    (0x1FB00, 'Symbols for Legacy Computing'),
+    (0x1FC00, 'No block'),
+    (0x20000, 'CJK Unified Ideographs Extension B'),
+    (0x2A6E0, 'No block'),
+    (0x2A700, 'CJK Unified Ideographs Extension C'),
+    (0x2B740, 'CJK Unified Ideographs Extension D'),
+    (0x2B820, 'CJK Unified Ideographs Extension E'),
+    (0x2CEB0, 'CJK Unified Ideographs Extension F'),
+    (0x2EBF0, 'No block'),
+    (0x2F800, 'CJK Compatibility Ideographs Supplement'),
+    (0x2FA20, 'No block'),
+    (0x30000, 'CJK Unified Ideographs Extension G'),
+    (0x31350, 'No block'),
+    (0xE0000, 'Tags'),
+    (0xE0080, 'No block'),
+    (0xE0100, 'Variation Selectors Supplement'),
+    (0xE01F0, 'No block'),
+    (0xF0000, 'Supplementary Private Use Area-A'),
+    (0x100000, 'Supplementary Private Use Area-B'),
+]
+_STARTS = [start for start, _ in BLOCKS]
+_NAMES = [name for _, name in BLOCKS]
+
+
+class Profile:
+    def __init__(self):
+        self.chars = 0
+        self.bytes = 0
+        self.ascii_chars = 0
+        self.min_code_point = None
+        self.max_code_point = None
+        self.block_counts = [0] * len(BLOCKS)
+        self.invalid_count = 0  # invalid byte sequences
+        self.invalid = []  # (start, end) byte offsets of the first MAX_INVALID ones
+
+    @property
+    def percent_ascii(self):
+        return 100.0 * self.ascii_chars / self.chars if self.chars else 100.0
+
+    @property
+    def blocks(self):
+        """{block name: number of characters} for the blocks present"""
+        return {name: count for name, count in zip(_NAMES, self.block_counts) if count}
+
+    def _extremes(self, low, high):
+        if self.min_code_point is None or low < self.min_code_point:
+            self.min_code_point = low
+        if self.max_code_point is None or high > self.max_code_point:
+            self.max_code_point = high
+
+    def add_ascii(self, chunk):
+        if chunk:
+            self.chars += len(chunk)
+            self.ascii_chars += len(chunk)
+            self.block_counts[0] += len(chunk)
+            if np is not None:
+                values = np.frombuffer(chunk, dtype=np.uint8)
+                self._extremes(int(values.min()), int(values.max()))
+            else:
+                self._extremes(min(chunk), max(chunk))
+
+    def add_text(self, text):
+        if not text:
+            return
+        self.chars += len(text)
+        ascii_before = self.block_counts[0]
+        code_points = array('I')
+        code_points.frombytes(text.encode('utf-32-le', 'surrogatepass'))  # every code point as a C integer
+        if np is not None:
+            values = np.frombuffer(code_points, dtype='<u4')
+            self._extremes(int(values.min()), int(values.max()))
+            counts = np.bincount(np.searchsorted(_STARTS, values, side='right') - 1, minlength=len(BLOCKS))
+            for i in np.flatnonzero(counts):
+                self.block_counts[i] += int(counts[i])
+        else:
+            ordered = sorted(code_points)  # then one bisect per block instead of one per character
+            self._extremes(ordered[0], ordered[-1])
+            position = 0
+            for i, next_start in enumerate(_STARTS[1:] + [0x110000]):
+                end = bisect_left(ordered, next_start, position)
+                self.block_counts[i] += end - position
+                position = end
+        self.ascii_chars += self.block_counts[0] - ascii_before  # Basic Latin is exactly the ASCII range
+
+    def add_invalid(self, start, end):
+        self.invalid_count += 1
+        if len(self.invalid) < MAX_INVALID:
+            self.invalid.append((start, end))
+
+    def __repr__(self):
+        return ('Profile(chars={}, bytes={}, ascii={:.2f}%, min=U+{:04X}, max=U+{:04X}, invalid={}, blocks={})'
+                .format(self.chars, self.bytes, self.percent_ascii, self.min_code_point or 0,
+                        self.max_code_point or 0, self.invalid_count, self.blocks))
+
+
+_decoding = threading.local()  # profile and file offset of the data being decoded, for the error handler
+
+
+def _record_invalid(error):
+    _decoding.profile.add_invalid(_decoding.offset + error.start, _decoding.offset + error.end)
+    return '', error.end  # drop the invalid bytes, decoding goes on after them
+
+
+_ERRORS = 'codepoint_profiler.record_invalid'
+codecs.register_error(_ERRORS, _record_invalid)
+
+
+def _decode_chunk(profile, data, offset, final):
+    """Profile the valid UTF-8 of data (its first byte is at offset in the file), return the bytes not consumed"""
+    _decoding.profile, _decoding.offset = profile, offset
+    text, consumed = codecs.utf_8_decode(data, _ERRORS, final)
+    profile.add_text(text)
+    return data[consumed:]  # incomplete sequence at the end, completed by the next chunk
+
+
+def profile_stream(stream, chunk_size=CHUNK_SIZE):
+    """Profile a binary stream of UTF-8 text"""
+    profile = Profile()
+    pending = b''  # bytes of a sequence cut by the end of the previous chunk
+    offset = 0  # file offset of pending[0]
+    chunk = stream.read(chunk_size)
+    while chunk:
+        profile.bytes += len(chunk)
+        if not pending and chunk.isascii():
+            profile.add_ascii(chunk)  # fast path: nothing to decode
+            offset += len(chunk)
+        else:
+            data = pending + chunk
+            pending = _decode_chunk(profile, data, offset, False)
+            offset += len(data) - len(pending)
+        chunk = stream.read(chunk_size)
+    if pending:
+        _decode_chunk(profile, pending, offset, True)  # a truncated sequence at the end of the file is invalid
+    return profile
+
+
+def profile_file(path, chunk_size=CHUNK_SIZE):
+    with open(path, 'rb') as stream:
+        return profile_stream(stream, chunk_size)
+
+
+# ======= BENCHMARK ======= #
+
+def profile_ord_loop(path):
+    """The direct way: decode everything, ord() on every character"""
+    profile = Profile()
+    with open(path, 'rb') as stream:
+        data = stream.read()
+    profile.bytes = len(data)
+    text = data.decode('utf-8', 'replace')
+    for character in text:
+        code_point = ord(character)
+        profile.chars += 1
+        if code_point < 128:
+            profile.ascii_chars += 1
+        if profile.min_code_point is None or code_point < profile.min_code_point:
+            profile.min_code_point = code_point
+        if profile.max_code_point is None or code_point > profile.max_code_point:
+            profile.max_code_point = code_point
+        profile.block_counts[bisect_right(_STARTS, code_point) - 1] += 1
+    return profile
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    import tempfile
+    import time
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20 << 20  # bytes
+    lines = ['The quick brown fox jumps over the lazy dog 0123456789\n'] * 40 + [
+        'Le café est très bon, ça coûte 2 €\n', 'Привет, как дела?\n',
+        'こんにちは世界、漢字テスト\n', 'مرحبا بالعالم\n', 'emoji 😀🚀 ok\n']
+    sample = ''.join(lines).encode('utf-8')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'corpus.txt')
+        with open(path, 'wb') as stream:
+            for i in range(size // len(sample)):
+                stream.write(sample)
+                if i % 1000 == 0:
+                    stream.write(b'bad \xff\xfe bytes\n')
+        print('corpus: {:.1f} MB, numpy: {}'.format(os.path.getsize(path) / 1e6, np is not None))
+        for label, func in [('ord() loop', profile_ord_loop), ('profile_file', profile_file)]:
+            start = time.perf_counter()
+            profile = func(path)
+            elapsed = time.perf_counter() - start
+            print('  {:<14} {:>7.3f} s  {:>7.1f} MB/s'.format(label, elapsed, profile.bytes / elapsed / 1e6))
+        print(' ', profile)
@@ -0,0 +1,237 @@
+# ======== BULK DAY PARSER ========= #
+
+"""
+get_user_day_1 / get_user_day_2 of Module 4 read one day at a time, and the first bad value stops everything:
+
+    def get_user_day_1(lst):
+        day = int(input('please enter day 1 __ '))
+        lst.append(day)
+        return lst
+
+    try:
+        a = get_user_day_1(user_info)
+        ...
+    except ValueError:
+        ...
+
+parse_days reads a whole file (or stdin) of one day per line, converts every valid line and reports the malformed
+ones with their line number instead of stopping at the first ValueError:
+
+    result = parse_file('days.txt')
+    result.days         # [12, 3, 28, ...] the valid values, in file order
+    result.errors       # [(4, 'twelve'), (97, '3.5')] (line number from 1, line), the first max_errors ones
+    result.error_count  # all the malformed lines
+
+A line is valid when int() accepts it, blank lines are skipped. The file is read as bytes, chunk by chunk, and no
+exception is raised for a malformed line:
+    - with NumPy (optional) the lines made of 1 to 18 digits, the usual case, are converted all at once with
+      whole-array operations on the bytes of the chunk; the other lines (sign, spaces, '_', garbage) are checked
+      one by one with a regular expression, except the obviously malformed ones once max_errors are reported:
+      those are only counted
+    - without NumPy one regular expression (C code) finds the malformed lines of the chunk, then the runs of good
+      lines between them are converted with map(int, lines) (int() accepts bytes)
+"""
+
+import re
+import sys
+from itertools import compress
+
+try:
+    import numpy as np
+except ImportError:  # optional, converts the plain digit lines of a chunk with whole-array operations
+    np = None
+
+CHUNK_SIZE = 1 << 20
+MAX_ERRORS = 1000  # malformed lines kept in the report (all are counted)
+
+_SPACES = rb'[ \t\x0b\x0c\r]*'  # the whitespace int() strips from bytes (and the \r of \r\n)
+_INTEGER = rb'[+-]?[0-9]+(?:_[0-9]+)*'  # optional sign, digits with single '_' between them
+_VALID_LINE = re.compile(_SPACES + _INTEGER + _SPACES)
+_MALFORMED = re.compile(rb'^(?!' + _SPACES + _INTEGER + _SPACES + rb'$)[^\n]*$', re.MULTILINE)
+_MAX_DIGITS = 18  # plain digit lines up to this length fit in an int64
+_POWERS = [10 ** i for i in range(_MAX_DIGITS + 1)]
+
+
+class DayParse:
+    def __init__(self):
+        self.days = []
+        self.errors = []  # (line number, line)
+        self.error_count = 0
+        self.lines = 0
+
+    def __repr__(self):
+        return 'DayParse({} lines, {} days, {} malformed)'.format(self.lines, len(self.days), self.error_count)
+
+
+_SKIP = object()
+
+
+def _line_value(result, line, line_number, max_errors):
+    """int(line) without raising, _SKIP for a blank or malformed line (recorded in result)"""
+    if _VALID_LINE.fullmatch(line):
+        return int(line)
+    if not line.strip():
+        return _SKIP  # blank line
+    if not line.isascii():
+        try:  # int() also accepts non-ASCII digits ('١٢'): only such lines pay for an exception
+            return int(line.decode('utf-8'))
+        except (UnicodeDecodeError, ValueError):
+            pass
+    result.error_count += 1
+    if len(result.errors) < max_errors:
+        result.errors.append((line_number, line.rstrip(b'\r').decode('utf-8', 'replace')))
+    return _SKIP
+
+
+def _parse_block(result, block, max_errors):
+    """Parse complete lines (block has no final newline): map(int) on the runs of lines between the bad ones"""
+    lines = block.split(b'\n')
+    first_line = result.lines + 1
+    days = result.days
+    good_from = 0  # first line of the current run of good lines
+    line_index = 0
+    position = 0
+    for match in _MALFORMED.finditer(block):
+        line_index += block.count(b'\n', position, match.start())
+        position = match.start()
+        days.extend(map(int, lines[good_from:line_index]))
+        good_from = line_index + 1
+        value = _line_value(result, match.group(), first_line + line_index, max_errors)
+        if value is not _SKIP:
+            days.append(value)
+    days.extend(map(int, lines[good_from:]))
+    result.lines += len(lines)
+
+
+def _byte_table(characters):
+    table = np.zeros(256, dtype=bool)
+    table[list(characters)] = True
+    return table
+
+
+if np is not None:
+    _SPACE_BYTES = _byte_table(b' \t\x0b\x0c\r')
+    _GARBAGE_BYTES = ~_byte_table(b'0123456789+-_ \t\x0b\x0c\r')  # an ASCII line with one of them is malformed
+    _GARBAGE_BYTES[128:] = False  # non-ASCII digits are valid for int()
+    _POWERS_ARRAY = np.array(_POWERS, dtype=np.int64)
+
+
+def _parse_block_numpy(result, block, max_errors):
+    """Same as _parse_block: the lines of 1 to 18 digits are converted all at once, the others one by one"""
+    if not block:  # a single empty line
+        result.lines += 1
+        return
+    data = np.frombuffer(block, dtype=np.uint8)
+    newline = data == 10
+    ends = np.append(np.flatnonzero(newline), len(data))
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    lengths = ends - starts
+    reduce_at = np.minimum(starts, len(data) - 1)  # an empty last line starts at len(data)
+    not_empty = lengths > 0
+
+    def any_per_line(byte_mask):  # lines having a byte in byte_mask
+        return not_empty & (np.add.reduceat(byte_mask & ~newline, reduce_at) > 0)
+
+    digits = data - 48  # uint8: every byte that is not a digit becomes >= 10
+    plain = not_empty & (lengths <= _MAX_DIGITS) & ~any_per_line(digits > 9)
+    # value of a plain line: sum of digit * 10 ** (position from the end of the line)
+    line_of = np.cumsum(newline) - newline  # a newline belongs to the line it ends
+    weights = _POWERS_ARRAY[np.clip(ends[line_of] - np.arange(len(data)) - 1, 0, _MAX_DIGITS)]
+    weights[~plain[line_of] | newline] = 0
+    values = np.add.reduceat(digits.astype(np.int64) * weights, reduce_at).tolist()
+
+    result.lines += len(values)
+    if plain.all():  # the usual chunk: nothing else to do
+        result.days.extend(values)
+        return
+    others = ~plain & any_per_line(~_SPACE_BYTES[data])  # not blank either
+    if len(result.errors) >= max_errors:  # the report is full: malformed lines are only counted, no need to visit
+        garbage = others & any_per_line(_GARBAGE_BYTES[data])
+        result.error_count += int(np.count_nonzero(garbage))
+        others &= ~garbage
+    keep = plain.tolist()
+    first_line = result.lines - len(values) + 1
+    starts, ends = starts.tolist(), ends.tolist()  # Python ints slice faster than NumPy scalars
+    for i in np.flatnonzero(others).tolist():
+        value = _line_value(result, block[starts[i]:ends[i]], first_line + i, max_errors)
+        if value is not _SKIP:
+            values[i] = value
+            keep[i] = True
+    result.days.extend(compress(values, keep))
+
+
+def parse_days(stream, chunk_size=CHUNK_SIZE, max_errors=MAX_ERRORS):
+    """Parse a binary stream of one integer per line, return a DayParse"""
+    result = DayParse()
+    parse_block = _parse_block if np is None else _parse_block_numpy
+    carry = b''  # beginning of a line cut by the end of the previous chunk
+    chunk = stream.read(chunk_size)
+    while chunk:
+        data = carry + chunk if carry else chunk
+        cut = data.rfind(b'\n')
+        if cut == -1:
+            carry = data
+        else:
+            parse_block(result, data[:cut], max_errors)
+            carry = data[cut + 1:]
+        chunk = stream.read(chunk_size)
+    if carry:
+        parse_block(result, carry, max_errors)  # last line without a newline
+    return result
+
+
+def parse_file(path, chunk_size=CHUNK_SIZE, max_errors=MAX_ERRORS):
+    """Parse a file, or stdin when path is '-'"""
+    if path == '-':
+        return parse_days(sys.stdin.buffer, chunk_size, max_errors)
+    with open(path, 'rb') as stream:
+        return parse_days(stream, chunk_size, max_errors)
+
+
+# ======= BENCHMARK ======= #
+
+def parse_per_call(path):
+    """The Module 4 way: int() per line in a try / except ValueError"""
+    result = DayParse()
+    with open(path, 'rb') as stream:
+        for line_number, line in enumerate(stream, 1):
+            result.lines += 1
+            try:
+                result.days.append(int(line))
+            except ValueError:
+                if line.strip():
+                    result.error_count += 1
+                    if len(result.errors) < MAX_ERRORS:
+                        result.errors.append((line_number, line.rstrip(b'\r\n').decode('utf-8', 'replace')))
+    return result
+
+
+if __name__ == '__main__':
+    import os
+    import random
+    import tempfile
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000  # lines
+    random.seed(0)
+    bad_values = ['twelve', '3.5', '', '1__0', '--4', 'day 7', ' 1 2']
+    with tempfile.TemporaryDirectory() as tmp:
+        for bad_rate in (0.0, 0.01, 0.5):
+            path = os.path.join(tmp, 'days.txt')
+            with open(path, 'w') as stream:
+                for _ in range(count):
+                    if random.random() < bad_rate:
+                        stream.write(random.choice(bad_values) + '\n')
+                    else:
+                        stream.write('{}\n'.format(random.randint(1, 31)))
+            print('{:.0%} bad lines, {} lines'.format(bad_rate, count))
+            results = []
+            for label, parse in [('int() per line + except', parse_per_call), ('parse_file', parse_file)]:
+                start = time.perf_counter()
+                results.append(parse(path))
+                elapsed = time.perf_counter() - start
+                print('    {:<26} {:>7.3f} s  {:>10.0f} lines/s  {}'.format(label, elapsed, count / elapsed,
+                                                                          results[-1]))
+            assert results[0].days == results[1].days and results[0].errors == results[1].errors
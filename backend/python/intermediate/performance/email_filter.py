@@ -0,0 +1,234 @@
+# ======== STREAMING EMAIL FILTER ========= #
+
+"""
+Module 4 filters email addresses with a lambda:
+
+    emails_adresses = ['rdplus@gmail.com', 'ridi-gmail.com']
+    print(list(filter(lambda y: '@' in y, emails_adresses)))
+
+'@' in y accepts 'a@@b' or '@', and the list must be in memory. Here:
+    - one precompiled regular expression checks the structure (local part @ domain labels . tld), and it runs on a
+      whole chunk of lines at once (re.MULTILINE), not one Python call per line
+    - addresses are normalized: spaces stripped, domain in lower case (local part too with lower_local=True)
+    - all the paths see the same lines: a line ends at '\n' only (a lone '\r' does not end it), and only spaces,
+      tabs and '\r' around the address are ignored (not '\f' / '\v', which str.strip() would remove). filter_file
+      opens the file with newline='\n'; give filter_lines lines read the same way
+    - duplicates are removed with a set (exact, memory grows with the number of addresses) or with a BloomFilter
+      (fixed memory, a few unique addresses are wrongly seen as duplicates: error_rate)
+    - filter_file_parallel cuts the file in byte ranges and validates them in a pool of processes
+"""
+
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 1 << 20  # bytes of text validated by one regex call
+RANGE_SIZE = 16 << 20  # bytes of file given to one process
+
+_ATOM = r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+"
+_LOCAL = _ATOM + r'(?:\.' + _ATOM + r')*'
+_DOMAIN = r'(?:[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?\.)+[A-Za-z]{2,63}'
+EMAIL_LINE = re.compile(r'^[ \t\r]*(' + _LOCAL + r')@(' + _DOMAIN + r')[ \t\r]*$', re.MULTILINE)
+EMAIL = re.compile(r'(' + _LOCAL + r')@(' + _DOMAIN + r')\Z')
+
+MAX_LOCAL = 64
+MAX_ADDRESS = 254
+_BLANKS = ' \t\r\n'  # stripped around an address, the same as [ \t\r]* around it in EMAIL_LINE plus the line end
+
+
+def is_valid(address):
+    match = EMAIL.match(address.strip(_BLANKS))
+    return match is not None and len(match.group(1)) <= MAX_LOCAL and len(match.group(0)) <= MAX_ADDRESS
+
+
+def normalize(address, lower_local=False):
+    local, _, domain = address.strip(_BLANKS).rpartition('@')
+    if lower_local:
+        local = local.lower()
+    return local + '@' + domain.lower()
+
+
+def _valid_in_text(text, lower_local):
+    """Every valid address of a block of lines, normalized"""
+    result = []
+    for local, domain in EMAIL_LINE.findall(text):
+        if len(local) <= MAX_LOCAL and len(local) + len(domain) < MAX_ADDRESS:
+            result.append((local.lower() if lower_local else local) + '@' + domain.lower())
+    return result
+
+
+class BloomFilter:
+    """Set of strings in a fixed bit array: no false negatives, about error_rate false positives"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.size = bits
+        self.hash_count = max(1, round(bits / capacity * math.log(2)))
+        self._bits = bytearray((bits + 7) // 8)
+
+    def _positions(self, item):
+        # double hashing: k positions from 2 hashes. hash() of str is salted per process (PYTHONHASHSEED), fine for
+        # a filter that lives in memory, it must not be saved and reloaded by another process
+        h1 = hash(item)
+        h2 = hash(item + '\x00') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, item):
+        """Add item, return True if it was (probably) already there"""
+        bits = self._bits
+        present = True
+        for position in self._positions(item):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        return present
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+def _deduplicate(addresses, dedupe, capacity, error_rate):
+    if dedupe is None:
+        yield from addresses
+        return
+    if dedupe == 'exact':
+        seen = set()
+        for address in addresses:
+            if address not in seen:
+                seen.add(address)
+                yield address
+    elif dedupe == 'bloom':
+        bloom = BloomFilter(capacity, error_rate)
+        for address in addresses:
+            if not bloom.add(address):
+                yield address
+    else:
+        raise ValueError("dedupe must be None, 'exact' or 'bloom'")
+
+
+def _text_chunks(stream, chunk_size):
+    """Blocks of whole lines: readlines(hint) stops at a line end after about chunk_size characters"""
+    lines = stream.readlines(chunk_size)
+    while lines:
+        yield ''.join(lines)
+        lines = stream.readlines(chunk_size)
+
+
+def filter_lines(lines, lower_local=False, dedupe='exact', capacity=10 ** 7, error_rate=0.001):
+    """Yield the valid, normalized, deduplicated addresses of an iterable of lines (one address per line)"""
+    def valid():
+        for line in lines:
+            if is_valid(line):
+                yield normalize(line, lower_local)
+    return _deduplicate(valid(), dedupe, capacity, error_rate)
+
+
+def filter_file(path, lower_local=False, dedupe='exact', capacity=10 ** 7, error_rate=0.001, encoding='utf-8',
+                chunk_size=CHUNK_SIZE):
+    """Same as filter_lines on the lines of a file, validating a chunk of lines per regex call"""
+    def valid():
+        with open(path, encoding=encoding, errors='replace', newline='\n') as stream:  # lines end at '\n' only
+            for text in _text_chunks(stream, chunk_size):
+                yield from _valid_in_text(text, lower_local)
+    return _deduplicate(valid(), dedupe, capacity, error_rate)
+
+
+def _valid_in_range(path, start, end, lower_local, encoding):
+    """Valid addresses of the lines starting in [start, end) of the file"""
+    with open(path, 'rb') as stream:
+        if start:
+            stream.seek(start - 1)
+            stream.readline()  # skip the line that started before start, the previous range owns it
+        result = []
+        while stream.tell() < end:
+            data = stream.read(min(CHUNK_SIZE, end - stream.tell()))
+            if not data.endswith(b'\n'):
+                data += stream.readline()  # finish the last line (a line starting at end is the next range's)
+            result.extend(_valid_in_text(data.decode(encoding, 'replace'), lower_local))
+        return result
+
+
+def filter_file_parallel(path, workers=None, lower_local=False, dedupe='exact', capacity=10 ** 7,
+                         error_rate=0.001, encoding='utf-8', range_size=RANGE_SIZE):
+    """filter_file with the validation spread over processes. Output order is the file order."""
+    size = os.path.getsize(path)
+    starts = list(range(0, size, range_size))
+
+    def valid():
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            ranges = pool.map(_valid_in_range, [path] * len(starts), starts,
+                              [min(start + range_size, size) for start in starts],
+                              [lower_local] * len(starts), [encoding] * len(starts))
+            for addresses in ranges:
+                yield from addresses
+
+    return _deduplicate(valid(), dedupe, capacity, error_rate)
+
+
+# ======= BENCHMARK ======= #
+
+def _write_sample(path, count):
+    import random
+
+    random.seed(0)
+    domains = ['gmail.com', 'Example.ORG', 'mail.co.uk', 'yahoo.fr']
+    bad = ['ridi-gmail.com', '@gmail.com', 'a@@b.com', 'no.tld@localhost', 'x@-bad-.com']
+    with open(path, 'w') as stream:
+        for i in range(count):
+            if i % 10 == 0:
+                stream.write(bad[i % len(bad)] + '\n')
+            else:
+                stream.write('user{}.{}@{}\n'.format(random.randrange(count // 2), i % 7, domains[i % 4]))
+
+
+def _measure(make, sender):
+    import resource
+    import time
+
+    start = time.perf_counter()
+    kept = 0
+    for _ in make():
+        kept += 1
+    elapsed = time.perf_counter() - start
+    sender.send((elapsed, kept, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))  # kB on Linux
+
+
+if __name__ == '__main__':
+    import multiprocessing
+    import sys
+    import tempfile
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000  # lines, 50000000 for the full test
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'emails.txt')
+        _write_sample(path, count)
+        print(count, 'lines,', os.path.getsize(path) >> 20, 'MiB')
+
+        def lambda_filter():
+            with open(path) as stream:
+                yield from filter(lambda y: '@' in y, stream)
+
+        def per_line():
+            with open(path, newline='\n') as stream:
+                yield from filter_lines(stream)
+
+        candidates = [
+            ("filter(lambda y: '@' in y)", lambda_filter),
+            ('filter_lines (per line)', per_line),
+            ('filter_file exact', lambda: filter_file(path)),
+            ('filter_file bloom', lambda: filter_file(path, dedupe='bloom', capacity=count)),
+            ('filter_file_parallel', lambda: filter_file_parallel(path)),
+        ]
+        for label, make in candidates:
+            # each candidate runs in a fresh forked process: its peak RSS is not mixed with the others
+            receiver, sender = multiprocessing.Pipe(False)
+            process = multiprocessing.get_context('fork').Process(target=_measure, args=(make, sender))
+            process.start()
+            elapsed, kept, peak = receiver.recv()
+            process.join()
+            print('  {:<28} {:>7.2f} s  {:>10.0f} lines/s  kept {:>9}  peak RSS {:>7.1f} MB'.format(
+                label, elapsed, count / elapsed, kept, peak / 1e3))
@@ -0,0 +1,182 @@
+# ======== EXTERNAL MERGE SORT ========= #
+
+"""
+sorted(students, key=...) returns a sorted copy, students.sort(key=...) sorts in place: both need every record in
+memory. external_sort sorts (name, age, grade) records that do not fit in memory:
+
+    1. records are read until the memory budget is used, sorted with list.sort (stable) and written to a temporary
+       file (a 'run') in a compact binary format: age, grade and the UTF-8 name, 8 bytes + len(name) per record
+    2. the runs are merged with heapq.merge, which keeps the smallest head of every run in a heap: the next record
+       of the output is always at the top. With more than MAX_FAN_IN runs, groups of runs are first merged into
+       bigger runs.
+
+    for name, age, grade in external_sort(students, key='grade', memory_budget=64 << 20):
+        ...
+
+The sort is stable like list.sort: records with equal keys come out in input order (every run is stable and
+heapq.merge takes equal records from the earliest run first). The records can be tuples or objects with name, age
+and grade attributes (Student, SlottedStudent, StudentRow); factory=Student gives Student objects back.
+"""
+
+import heapq
+import os
+import struct
+import sys
+import tempfile
+
+MEMORY_BUDGET = 64 << 20  # bytes of records kept in memory while building the runs
+MAX_FAN_IN = 64  # runs merged at the same time (open files)
+_RECORD = struct.Struct('<HiH')  # age, grade, len(name in UTF-8), then the name
+_FIELDS = {'name': 0, 'age': 1, 'grade': 2}
+
+
+def _memory_estimate(name):
+    """Approximate bytes of a (name, age, grade) tuple in a list: tuple, name string, list slot"""
+    return 56 + 8 + sys.getsizeof(name)
+
+
+def _as_tuple(record):
+    if isinstance(record, tuple):
+        return record
+    return record.name, record.age, record.grade
+
+
+def _key_function(key):
+    if key is None:
+        return None
+    if callable(key):
+        return key
+    if key not in _FIELDS:
+        raise ValueError('key must be a callable or one of {}, not {!r}'.format(sorted(_FIELDS), key))
+    index = _FIELDS[key]
+    return lambda record: record[index]
+
+
+def _write_run(path, records):
+    pack = _RECORD.pack
+    with open(path, 'wb', buffering=1 << 20) as stream:
+        for name, age, grade in records:
+            encoded = name.encode('utf-8')
+            stream.write(pack(age, grade, len(encoded)))
+            stream.write(encoded)
+
+
+def _read_run(path, buffer_size):
+    """Yield the (name, age, grade) records of a run, reading buffer_size bytes at a time"""
+    unpack_from = _RECORD.unpack_from
+    header = _RECORD.size
+    data = b''
+    position = 0
+    with open(path, 'rb', buffering=0) as stream:
+        while True:
+            block = stream.read(buffer_size)
+            if not block:
+                break
+            data = data[position:] + block
+            position = 0
+            end = len(data)
+            while position + header <= end:
+                age, grade, size = unpack_from(data, position)
+                start = position + header
+                if start + size > end:
+                    break  # the name goes on in the next block
+                yield data[start:start + size].decode('utf-8'), age, grade
+                position = start + size
+    if position != len(data):
+        raise ValueError('truncated run file: ' + path)
+
+
+def _merge(paths, key, reverse, buffer_size):
+    return heapq.merge(*(_read_run(path, buffer_size) for path in paths), key=key, reverse=reverse)
+
+
+def external_sort(records, key=None, reverse=False, memory_budget=MEMORY_BUDGET, tmp_dir=None, factory=None):
+    """Iterate the records sorted by key ('name', 'age', 'grade' or a function of the (name, age, grade) tuple)"""
+    key = _key_function(key)
+    records = map(_as_tuple, records)
+    with tempfile.TemporaryDirectory(prefix='external_sort_', dir=tmp_dir) as tmp:
+        paths = []
+        run = []
+        used = 0
+        for record in records:
+            run.append(record)
+            used += _memory_estimate(record[0])
+            if used >= memory_budget:
+                run.sort(key=key, reverse=reverse)
+                paths.append(os.path.join(tmp, 'run{}'.format(len(paths))))
+                _write_run(paths[-1], run)
+                run = []
+                used = 0
+        run.sort(key=key, reverse=reverse)
+        if not paths:  # everything fits in the budget: no file at all
+            result = iter(run)
+        else:
+            # every open run gets a share of the budget for its read buffer, the last run stays in memory
+            buffer_size = max(1 << 16, (memory_budget - used) // min(len(paths), MAX_FAN_IN))
+            count = len(paths)
+            while len(paths) > MAX_FAN_IN:  # merge the oldest runs first: stability needs the input order
+                merged = os.path.join(tmp, 'run{}'.format(count))
+                count += 1
+                _write_run(merged, _merge(paths[:MAX_FAN_IN], key, reverse, buffer_size))
+                for path in paths[:MAX_FAN_IN]:
+                    os.remove(path)
+                paths = [merged] + paths[MAX_FAN_IN:]
+            runs = [_read_run(path, buffer_size) for path in paths] + [iter(run)]
+            result = heapq.merge(*runs, key=key, reverse=reverse)
+        if factory is None:
+            yield from result
+        else:
+            for name, age, grade in result:
+                yield factory(name, age, grade)
+
+
+# ======= BENCHMARK ======= #
+
+def _sample_rows(count, seed=0):
+    import random
+
+    generator = random.Random(seed)
+    first_names = ['ridi', 'anna', 'marc', 'lea', 'tom', 'sara', 'paul', 'ines', 'élodie', 'zoë']
+    for _ in range(count):
+        yield (generator.choice(first_names) + str(generator.randrange(100000)), generator.randint(17, 30),
+               generator.randrange(21))
+
+
+def _measure(sort, count, sender):
+    import resource
+    import time
+
+    start = time.perf_counter()
+    checksum = 0
+    previous = None
+    for name, age, grade in sort(_sample_rows(count)):
+        assert previous is None or previous <= grade
+        previous = grade
+        checksum = (checksum * 31 + age) & 0xFFFFFFFF
+    sender.send((time.perf_counter() - start, checksum, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+if __name__ == '__main__':
+    import multiprocessing
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000  # records, 20000000 for the full test
+    data_size = sum(_memory_estimate(name) for name, _, _ in _sample_rows(count))
+    budget = data_size // 10  # the data is 10 times the memory the sort is allowed to use
+    print('{} records, about {:.0f} MB as tuples in a list, memory budget {:.0f} MB'.format(
+        count, data_size / 1e6, budget / 1e6))
+    candidates = [
+        ("sorted(key=grade)", lambda rows: sorted(rows, key=lambda row: row[2])),
+        ('external_sort(key=grade)', lambda rows: external_sort(rows, key='grade', memory_budget=budget)),
+    ]
+    checksums = set()
+    for label, sort in candidates:
+        # a fresh forked process per candidate: its peak RSS is not mixed with the other one
+        receiver, sender = multiprocessing.Pipe(False)
+        process = multiprocessing.get_context('fork').Process(target=_measure, args=(sort, count, sender))
+        process.start()
+        elapsed, checksum, peak = receiver.recv()
+        process.join()
+        checksums.add(checksum)
+        print('  {:<26} {:>7.2f} s  {:>10.0f} records/s  peak RSS {:>7.1f} MB'.format(
+            label, elapsed, count / elapsed, peak / 1e3))
+    assert len(checksums) == 1  # same order: the external sort is stable like sorted()
@@ -0,0 +1,183 @@
+# ======== GENERATOR TOOLS: PREFETCH AND BATCHING ========= #
+
+"""
+gen() of Module 4 yields one value for every next():
+
+    def gen():
+        for num in range(1, 6):
+            yield num
+
+A generator only runs when the consumer asks for the next value, so a slow producer (disk, decompression) and a
+slow consumer never work at the same time.
+
+    Prefetch(gen(), size=64)     runs the generator in a background thread and keeps up to size values ready
+                                 in a queue. Exceptions of the generator are raised in the consumer, close() stops
+                                 the thread and closes the generator (so does dropping the Prefetch, a bit later:
+                                 the thread only sees it at its next value or poll).
+    batched(gen(), 100)          lists of 100 values (the last one can be shorter)
+    batched_by_time(gen(), 100, max_wait=0.5)
+                                 lists of at most 100 values, but a batch is also sent when its first value has
+                                 waited max_wait seconds (uses a Prefetch to wait with a timeout)
+
+The background thread helps when the producer waits outside Python (I/O, zlib, ...): the GIL is released there.
+A producer doing pure Python work gets no overlap.
+"""
+
+import queue
+import threading
+import time
+from itertools import islice
+
+DEFAULT_PREFETCH = 64
+_POLL = 0.1  # seconds, how often a blocked producer checks if it must stop
+
+_ITEM, _ERROR, _END = range(3)
+
+
+def _put(items, stop, message):
+    while not stop.is_set():
+        try:
+            items.put(message, timeout=_POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _produce(source, items, stop):
+    """Body of the Prefetch thread: it gets no reference to the Prefetch, so dropping the Prefetch stops it"""
+    try:
+        for item in source:
+            if not _put(items, stop, (_ITEM, item)):
+                break
+        else:
+            _put(items, stop, (_END, None))
+    except BaseException as e:  # sent to the consumer, raised by next()
+        _put(items, stop, (_ERROR, e))
+    finally:
+        if stop.is_set() and hasattr(source, 'close'):
+            source.close()  # in the thread that ran it: runs the finally blocks of the generator
+
+
+class Prefetch:
+    def __init__(self, iterable, size=DEFAULT_PREFETCH):
+        if size <= 0:
+            raise ValueError('size must be positive')
+        self._source = iter(iterable)
+        self._queue = queue.Queue(size)
+        self._stop = threading.Event()
+        self._finished = False
+        self._thread = threading.Thread(target=_produce, args=(self._source, self._queue, self._stop), daemon=True)
+        self._thread.start()
+
+    def get(self, timeout=None):
+        """Next value, queue.Empty if none is ready within timeout seconds, StopIteration at the end"""
+        if self._finished:
+            raise StopIteration
+        kind, value = self._queue.get(timeout=timeout)
+        if kind == _ITEM:
+            return value
+        self._finished = True
+        self._thread.join()
+        if kind == _ERROR:
+            raise value
+        raise StopIteration
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.get()
+
+    def close(self):
+        """Stop the producer thread (after the value it is computing) and close the source generator"""
+        if self._finished:
+            return
+        self._finished = True
+        self._stop.set()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self._stop.set()  # never join in __del__: the thread ends by itself and closes the source
+
+
+def batched(iterable, size):
+    """Yield lists of size values"""
+    if size <= 0:
+        raise ValueError('size must be positive')
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def batched_by_time(iterable, size, max_wait, prefetch_size=DEFAULT_PREFETCH):
+    """Yield lists of at most size values, a batch never waits more than max_wait seconds after its first value"""
+    if size <= 0:
+        raise ValueError('size must be positive')
+    source = iterable if isinstance(iterable, Prefetch) else Prefetch(iterable, prefetch_size)
+    try:
+        while True:
+            try:
+                batch = [source.get()]
+            except StopIteration:
+                return
+            deadline = time.monotonic() + max_wait
+            while len(batch) < size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(source.get(timeout=remaining))
+                except queue.Empty:
+                    break
+                except StopIteration:
+                    yield batch
+                    return
+            yield batch
+    finally:
+        source.close()
+
+
+# ======= BENCHMARK ======= #
+
+def _slow_gen(count, delay):
+    for num in range(count):
+        time.sleep(delay)  # disk read, decompression...
+        yield num
+
+
+if __name__ == '__main__':
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    delay = 0.001
+
+    def consume(values):
+        total = 0
+        for num in values:
+            time.sleep(delay)  # the consumer works as long as the producer
+            total += num
+        return total
+
+    print(count, 'values, producer and consumer each take', delay * 1e3, 'ms per value')
+    for label, make in [('plain generator', lambda: _slow_gen(count, delay)),
+                        ('Prefetch(size=64)', lambda: Prefetch(_slow_gen(count, delay)))]:
+        start = time.perf_counter()
+        total = consume(make())
+        elapsed = time.perf_counter() - start
+        print('  {:<20} {:>6.3f} s  ({:.2f} ms per value)'.format(label, elapsed, elapsed / count * 1e3))
+        assert total == sum(range(count))
+
+    start = time.perf_counter()
+    sizes = [len(batch) for batch in batched_by_time(_slow_gen(200, 0.002), 1000, max_wait=0.05)]
+    print('  batched_by_time(1000, max_wait=0.05) over a 2 ms producer: {} batches of ~{} values in {:.2f} s'.format(
+        len(sizes), sizes[0], time.perf_counter() - start))
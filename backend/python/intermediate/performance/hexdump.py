@@ -0,0 +1,135 @@
+# ======== STREAMING HEXDUMP ========= #
+
+"""
+Replacement for the byte printing loops of Module 4 (binary file):
+
+    for byte in byte_array:
+        print(hex(byte), end='')     # Read as hexadecimal   -> 0x640x780x00x0...
+    for byte in byte_array:
+        print(int(byte), end=' ')    # read as integer       -> 100 120 0 0 ...
+
+Each print() call formats and writes one byte. Here a whole row (or a whole chunk) is formatted at once with C helpers
+(bytes.hex, bytes.translate, str.join over a lookup table) and written with one write() call.
+Files are read block by block with BlockReader, so memory stays constant whatever the file size.
+
+Modes:
+    'hex'       same text as the print(hex(byte), end='') loop
+    'int'       same text as the print(int(byte), end=' ') loop
+    'canonical' classic hexdump rows: offset, hex columns, ASCII column
+"""
+
+import sys
+
+from block_reader import BlockReader
+
+ROW_WIDTH = 16
+ROWS_PER_CHUNK = 4096
+
+_HEX = [hex(i) for i in range(256)]  # '0x0', '0x1', ... like hex(byte)
+_INT = [str(i) + ' ' for i in range(256)]  # '0 ', '1 ', ... like print(int(byte), end=' ')
+# printable ASCII stays, everything else becomes '.'
+_ASCII = bytes(i if 0x20 <= i < 0x7F else ord('.') for i in range(256))
+
+
+def format_hex(data):
+    """Same text as print(hex(byte), end='') for every byte of data"""
+    return ''.join(map(_HEX.__getitem__, data))
+
+
+def format_int(data):
+    """Same text as print(int(byte), end=' ') for every byte of data"""
+    return ''.join(map(_INT.__getitem__, data))
+
+
+def format_canonical(data, offset=0, width=ROW_WIDTH):
+    """Canonical rows for data whose first byte is at offset: '00000010  64 78 00 ..  00 00 ..  |dx..............|'"""
+    data = bytes(data)
+    # hex and ASCII columns of the whole chunk are built once, each row only slices them
+    columns = data.hex(' ') + ' '  # 3 characters per byte
+    text = data.translate(_ASCII).decode('ascii')
+    half = 3 * (width // 2)
+    row_size = 3 * width
+    rows = []
+    for start in range(0, len(data), width):
+        col = 3 * start
+        rows.append('{:08x}  {:<{}} |{}|\n'.format(offset + start,
+                                                   columns[col:col + half] + ' ' + columns[col + half:col + row_size],
+                                                   row_size + 1, text[start:start + width]))
+    return ''.join(rows)
+
+
+def iter_rows(data, offset=0, width=ROW_WIDTH):
+    """Yield canonical rows for data (bytes, bytearray or memoryview) whose first byte is at offset"""
+    view = memoryview(data).cast('B')
+    step = width * ROWS_PER_CHUNK
+    for start in range(0, len(view), step):
+        yield from format_canonical(view[start:start + step], offset + start, width).splitlines(True)
+
+
+_FORMATTERS = {
+    'hex': lambda chunk, offset, width: format_hex(chunk),
+    'int': lambda chunk, offset, width: format_int(chunk),
+    'canonical': format_canonical,
+}
+
+
+def dump(data, out=sys.stdout, mode='canonical', offset=0, width=ROW_WIDTH):
+    """Write the dump of an in-memory buffer to out"""
+    if mode not in _FORMATTERS:
+        raise ValueError('unknown mode: ' + repr(mode))
+    out.write(_FORMATTERS[mode](memoryview(data).cast('B'), offset, width))
+
+
+def dump_file(path, out=sys.stdout, mode='canonical', start=0, end=None, width=ROW_WIDTH):
+    """Stream the dump of the bytes [start, end) of a file to out, one chunk of rows at a time"""
+    if mode not in _FORMATTERS:
+        raise ValueError('unknown mode: ' + repr(mode))
+    formatter = _FORMATTERS[mode]
+    # a chunk is a whole number of rows, so no row is split between two chunks
+    with BlockReader(path, width * ROWS_PER_CHUNK) as reader:
+        for offset, block in reader.blocks(start, end):
+            out.write(formatter(block, offset, width))
+
+
+# ======= BENCHMARK ======= #
+
+def _print_hex(byte_array, out):
+    for byte in byte_array:
+        print(hex(byte), end='', file=out)
+
+
+def _print_int(byte_array, out):
+    for byte in byte_array:
+        print(int(byte), end=' ', file=out)
+
+
+if __name__ == '__main__':
+    import io
+    import os
+    import tempfile
+    import time
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1 << 20  # bytes
+    byte_array = bytearray(os.urandom(size))
+    byte_array[0] = 100
+    byte_array[1] = 120
+
+    def run(label, func):
+        out = io.StringIO()
+        start = time.perf_counter()
+        func(out)
+        elapsed = time.perf_counter() - start
+        print('{:<26} {:>8.3f} s  {:>8.2f} MB/s'.format(label, elapsed, size / elapsed / 1e6))
+        return out.getvalue()
+
+    print('dump of', size, 'bytes')
+    expected_hex = run('print(hex(byte)) loop', lambda out: _print_hex(byte_array, out))
+    got_hex = run("dump mode='hex'", lambda out: dump(byte_array, out, 'hex'))
+    expected_int = run('print(int(byte)) loop', lambda out: _print_int(byte_array, out))
+    got_int = run("dump mode='int'", lambda out: dump(byte_array, out, 'int'))
+    assert got_hex == expected_hex and got_int == expected_int
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'testb.bin')
+        with open(path, 'wb') as stream:
+            stream.write(byte_array)
+        run("dump_file mode='canonical'", lambda out: dump_file(path, out))
@@ -0,0 +1,205 @@
+# ======== SUBCLASS AWARE INSTANCE REGISTRY ========= #
+
+"""
+Module 3: isinstance(obj, Landvehicle) is true for a Landvehicle and for any subclass of it (Car). Finding every
+live Landvehicle that way means looking at every object of the program:
+
+    [obj for obj in gc.get_objects() if isinstance(obj, Landvehicle)]
+
+InstanceRegistry keeps weak references to the live instances of every tracked class, one table per class (like
+weakref.WeakSet, but by identity): the registry never keeps an object alive, a deleted object leaves its table by
+itself. A query reads the tables of the class and of its subclasses only, so it costs the size of the answer (plus
+one table per subclass), not the size of the heap:
+
+    registry.instances(Landvehicle)     # every live Landvehicle, Car included, like isinstance
+    registry.instances(Landvehicle, subclasses=False)   # type(obj) is Landvehicle
+    registry.count(Vehicle)
+
+Tracking is opt-in: inherit from Registered (the instance is added when it is created, in __new__), or call
+registry.add(obj) on the objects you want. The classes must accept weak references (no __slots__ without
+'__weakref__'). The instances are kept by identity, not by __hash__ / __eq__: unhashable classes (dataclasses),
+a __hash__ reading attributes that __init__ has not set yet, and equal instances are all tracked one by one.
+Registered uses the module registry REGISTRY unless the class sets its own 'registry' attribute.
+"""
+
+from functools import partial
+from operator import is_not
+from weakref import ref
+
+_alive = partial(is_not, None)
+
+
+class _KeyedRef(ref):
+    """Weak reference knowing its key in the table (weakref.KeyedRef, without its Python __new__ / __init__)"""
+    __slots__ = ('key',)
+
+
+class _Table(dict):
+    """id(obj) -> _KeyedRef to obj"""
+    __slots__ = ('remove',)
+
+    def __init__(self):
+        super().__init__()
+        self.remove = self._remove  # the callback of the references, one bound method for all of them
+
+    def _remove(self, reference):
+        if self.get(reference.key) is reference:  # not an object that has the id since then
+            del self[reference.key]
+
+
+class InstanceRegistry:
+    def __init__(self):
+        # class -> _Table {id(obj): weak reference to obj} of its direct instances. Keyed by identity: no __hash__
+        # or __eq__ of the objects is called. The entry leaves the table when the object dies, before its id can be
+        # given to another object.
+        self._tables = {}
+        self._subclasses = {}  # queried class -> [tracked classes that are subclasses of it], cache
+
+    def references(self, cls):
+        """The _Table of weak references to the direct instances of cls"""
+        references = self._tables.get(cls)
+        if references is None:
+            references = self._tables[cls] = _Table()
+            self._subclasses.clear()  # a new class can be a subclass of a queried one
+        return references
+
+    def add(self, obj):
+        references = self.references(type(obj))
+        reference = _KeyedRef(obj, references.remove)
+        reference.key = key = id(obj)
+        references[key] = reference
+        return obj
+
+    def discard(self, obj):
+        references = self._tables.get(type(obj))
+        if references is not None:
+            references.pop(id(obj), None)
+
+    def _classes(self, cls, subclasses):
+        if not subclasses:
+            return [cls] if cls in self._tables else []
+        classes = self._subclasses.get(cls)
+        if classes is None:
+            classes = self._subclasses[cls] = [tracked for tracked in list(self._tables) if issubclass(tracked, cls)]
+        return classes
+
+    def iter_instances(self, cls=object, subclasses=True):
+        """Live tracked instances of cls (and of its subclasses)"""
+        for tracked in self._classes(cls, subclasses):
+            # list(): a copy, an object that dies during the loop removes its reference from the dict
+            yield from filter(_alive, map(ref.__call__, list(self._tables[tracked].values())))
+
+    def instances(self, cls=object, subclasses=True):
+        return list(self.iter_instances(cls, subclasses))
+
+    def count(self, cls=object, subclasses=True):
+        return sum(len(self._tables[tracked]) for tracked in self._classes(cls, subclasses))
+
+    def counts(self):
+        """{class: number of live direct instances}"""
+        return {cls: len(references) for cls, references in self._tables.items() if references}
+
+
+REGISTRY = InstanceRegistry()
+
+
+class Registered:
+    """Mixin: every instance is added to cls.registry when it is created"""
+    __slots__ = ('__weakref__',)
+    registry = REGISTRY
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        references = cls.registry.references(cls)  # found once per class, not once per instance
+        cls._references = references
+        cls._remove_reference = references.remove  # one bound method shared by all the references
+
+    def __new__(cls, *args, **kwargs):
+        obj = object.__new__(cls)  # object.__new__ takes no other argument
+        reference = _KeyedRef(obj, cls._remove_reference)
+        reference.key = key = id(obj)  # no __hash__ call: __init__ has not run yet
+        cls._references[key] = reference
+        return obj
+
+
+class Vehicle(Registered):  # same as Module 3, tracked
+    def __init__(self, speed):
+        self.speed = speed
+
+
+class Landvehicle(Vehicle):
+    def __init__(self, speed, w_count):
+        super().__init__(speed)
+        self.w_count = w_count
+
+
+class Car(Landvehicle):
+    pass
+
+
+# ======= BENCHMARK ======= #
+
+class Boat(Vehicle):
+    pass
+
+
+class Truck(Landvehicle):  # a rare class: the query cost follows the size of the answer
+    pass
+
+
+class PlainVehicle:  # the same classes without tracking, to measure the cost of registering
+    def __init__(self, speed):
+        self.speed = speed
+
+
+class PlainLandvehicle(PlainVehicle):
+    def __init__(self, speed, w_count):
+        super().__init__(speed)
+        self.w_count = w_count
+
+
+class PlainCar(PlainLandvehicle):
+    pass
+
+
+class PlainBoat(PlainVehicle):
+    pass
+
+
+if __name__ == '__main__':
+    import gc
+    import random
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    random.seed(0)
+
+    def timed(label, func, per=count):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        print('  {:<46} {:>9.2f} ms  {:>6.0f} ns per object'.format(label, elapsed * 1e3, elapsed / per * 1e9))
+        return result
+
+    kinds = [random.randrange(4) for _ in range(count)]
+    makers = [lambda: PlainVehicle(60), lambda: PlainLandvehicle(60, 4), lambda: PlainCar(50, 4), lambda: PlainBoat(20)]
+    untracked = timed('create {} untracked objects'.format(count), lambda: [makers[kind]() for kind in kinds])
+    del untracked
+    makers = [lambda: Vehicle(60), lambda: Landvehicle(60, 4), lambda: Car(50, 4), lambda: Boat(20)]
+    fleet = timed('create {} tracked objects'.format(count), lambda: [makers[kind]() for kind in kinds])
+    fleet += [Truck(30, 6) for _ in range(count // 1000)]
+    others = [[i] for i in range(count)]  # the rest of the heap: a full scan also walks these
+    print('  live: {}'.format({cls.__name__: n for cls, n in REGISTRY.counts().items()}))
+
+    for cls in (Landvehicle, Car, Truck):
+        expected = timed('full list scan + isinstance({})'.format(cls.__name__),
+                         lambda: [obj for obj in fleet if isinstance(obj, cls)])
+        timed('gc.get_objects() + isinstance({})'.format(cls.__name__),
+              lambda: [obj for obj in gc.get_objects() if isinstance(obj, cls)])
+        found = timed('registry.instances({}) ({} found)'.format(cls.__name__, len(expected)),
+                      lambda: REGISTRY.instances(cls))
+        assert set(map(id, found)) == set(map(id, expected))
+    del expected, found
+    del fleet[:count // 2]  # dead objects leave the registry by themselves
+    assert REGISTRY.count(Vehicle) == len(fleet)
@@ -0,0 +1,196 @@
+# ======== LAZY SPLIT AND STREAMING JOIN ========= #
+
+"""
+Module 2: c.split() returns the list of all the parts, ''.join([a, b]) needs all the parts first. For a file of
+several GB both lists live in memory at the same time as the text.
+
+    isplit(data, sep=None, maxsplit=-1)
+        same parts as data.split(sep, maxsplit), one at a time. For bytes / bytearray / mmap / memoryview the parts
+        are memoryview slices of data: nothing is copied (bytes(part) makes a copy when needed).
+    isplit_stream(stream, sep=None)
+        same on a file opened in text or binary mode, read chunk by chunk. Only the new chunk is scanned (with the
+        len(sep) - 1 characters before it, where a cut separator starts): a part longer than a chunk is kept as a
+        list of pieces and joined once when it ends. Binary parts are memoryviews into the chunk that was read.
+    join_to(target, parts, sep='')
+        writes sep.join(parts) straight to an open file, the parts can come from a generator.
+
+The separators are found by the re module, which works on str and on any buffer (bytes, mmap, memoryview), in C.
+"""
+
+import re
+
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE_STR = re.compile(r'\S+')  # same whitespace as str.split()
+_WHITESPACE_BYTES = re.compile(rb'[^ \t\n\r\x0b\x0c]+')  # same whitespace as bytes.split()
+
+
+def _whitespace_spans(data, maxsplit):
+    pattern = _WHITESPACE_STR if isinstance(data, str) else _WHITESPACE_BYTES
+    splits = 0
+    for match in pattern.finditer(data):
+        if splits == maxsplit:  # like str.split: the rest of the text, from this word, is the last part
+            yield match.start(), len(data)
+            return
+        yield match.span()
+        splits += 1
+
+
+def _separator_spans(data, sep, maxsplit):
+    if not sep:
+        raise ValueError('empty separator')
+    position = 0
+    splits = 0
+    for match in re.finditer(re.escape(sep), data):
+        if splits == maxsplit:
+            break
+        yield position, match.start()
+        position = match.end()
+        splits += 1
+    yield position, len(data)
+
+
+def isplit(data, sep=None, maxsplit=-1):
+    """Iterator over data.split(sep, maxsplit), memoryview parts for binary data"""
+    spans = _whitespace_spans(data, maxsplit) if sep is None else _separator_spans(data, sep, maxsplit)
+    if isinstance(data, str):
+        for start, end in spans:
+            yield data[start:end]
+    else:
+        view = memoryview(data).cast('B')
+        for start, end in spans:
+            yield view[start:end]
+
+
+def _joined(pieces, binary):
+    return memoryview(b''.join(pieces)) if binary else ''.join(pieces)
+
+
+def isplit_stream(stream, sep=None, chunk_size=CHUNK_SIZE):
+    """Iterator over stream.read().split(sep), reading chunk_size characters / bytes at a time"""
+    if sep is not None and not sep:
+        raise ValueError('empty separator')
+    chunk = stream.read(chunk_size)
+    if not chunk:
+        if sep is not None:
+            yield chunk  # ''.split(',') == ['']
+        return
+    binary = not isinstance(chunk, str)
+    pieces = []  # beginning of a part cut by the end of the previous chunks, joined once when the part ends
+    if sep is None:
+        whitespace = b' \t\n\r\x0b\x0c' if binary else None
+        while chunk:
+            view = memoryview(chunk).cast('B') if binary else chunk
+            if pieces and (chunk[0] in whitespace if binary else chunk[0].isspace()):
+                yield _joined(pieces, binary)
+                pieces = []
+            for start, end in _whitespace_spans(chunk, -1):
+                if end == len(chunk):  # the word may go on in the next chunk
+                    pieces.append(view[start:end])
+                elif pieces:  # start == 0: the end of the cut word
+                    pieces.append(view[:end])
+                    yield _joined(pieces, binary)
+                    pieces = []
+                else:
+                    yield view[start:end]
+            chunk = stream.read(chunk_size)
+        if pieces:
+            yield _joined(pieces, binary)
+        return
+    pattern = re.compile(re.escape(sep))
+    keep = len(sep) - 1  # a separator cut by the end of a chunk starts in its last keep characters
+    tail = chunk[:0]
+    while chunk:
+        data = tail + chunk if tail else chunk  # the new chunk is scanned, the rest of the part is not
+        view = memoryview(data).cast('B') if binary else data
+        position = 0
+        for match in pattern.finditer(data):
+            if pieces:
+                pieces.append(view[:match.start()])
+                yield _joined(pieces, binary)
+                pieces = []
+            else:
+                yield view[position:match.start()]
+            position = match.end()
+        cut = max(position, len(data) - keep)
+        if cut > position:
+            pieces.append(view[position:cut])
+        tail = data[cut:]
+        chunk = stream.read(chunk_size)
+    pieces.append(tail)
+    yield _joined(pieces, binary)  # the last part, maybe empty
+
+
+def join_to(target, parts, sep=''):
+    """Write sep.join(parts) to target without building it, return the number of parts"""
+    count = 0
+
+    def with_separators():
+        nonlocal count
+        for part in parts:
+            if count:
+                yield sep
+            count += 1
+            yield part
+
+    target.writelines(with_separators())
+    return count
+
+
+# ======= BENCHMARK ======= #
+
+if __name__ == '__main__':
+    import io
+    import os
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50 << 20  # characters
+    line = 'abc 123 -abc  hello\tworld line 1\n'
+    text = line * (size // len(line))
+    data = text.encode()
+
+    def measure(label, func):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()  # second run: tracemalloc slows down every allocation, keep it out of the timing
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('  {:<34} {:>6.2f} s  {:>7.1f} MB/s  peak {:>7.1f} MB  -> {}'.format(
+            label, elapsed, len(data) / elapsed / 1e6, peak / 1e6, result))
+
+    def count(parts):
+        n = 0
+        for _ in parts:
+            n += 1
+        return n
+
+    print('split of {:.1f} MB (the text itself is not counted in the peak)'.format(len(data) / 1e6))
+    measure('len(text.split())', lambda: len(text.split()))
+    measure('isplit(text)', lambda: count(isplit(text)))
+    measure('len(data.split())', lambda: len(data.split()))
+    measure('isplit(data) (memoryview parts)', lambda: count(isplit(data)))
+    measure("len(text.split(' '))", lambda: len(text.split(' ')))
+    measure("isplit(text, ' ')", lambda: count(isplit(text, ' ')))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'text.txt')
+        with open(path, 'wb') as stream:
+            stream.write(data)
+
+        def from_file():
+            with open(path, 'rb') as stream:
+                return count(isplit_stream(stream))
+
+        measure('isplit_stream(binary file)', from_file)
+        measure("''.join(text.split())", lambda: len(''.join(text.split())))
+
+        def joined():
+            with open(os.path.join(tmp, 'out.txt'), 'w') as target:
+                return join_to(target, isplit(text))
+
+        measure('join_to(file, isplit(text))', joined)
+    assert list(isplit_stream(io.StringIO(text[:100000]), chunk_size=777)) == text[:100000].split()
@@ -0,0 +1,245 @@
+# ======== PER CLASS MEMORY FOOTPRINT ========= #
+
+"""
+Module 3 looks at dog1.__dict__ / dog2.__dict__ to see the state of one object. class_footprints looks at every live
+object of a program, groups them by class and reports, for each class:
+
+    count           live instances (exact)
+    shallow         sys.getsizeof of the objects themselves
+    dict            sys.getsizeof of their __dict__ (the instance variables)
+    deep            everything reachable from the objects: __dict__, slots, values, containers (classes / functions
+                    / modules not counted). An object reached from several sampled instances (a list or a config
+                    shared by all of them, an interned string) is shared: counted once, in deep_shared
+    dict overhead   part of the deep size taken by the __dict__ objects
+    key sharing     part of the instances whose attribute names, in order, are the usual layout of the class: such
+                    dicts share one table of keys (PEP 412), an instance that adds an attribute of its own
+                    (dog1.color = 'red') or sets them in another order is counted as not sharing. An estimate: CPython
+                    does not tell if a dict shares its keys
+
+Counting is one type() per object. The sizes are measured on a random sample of at most `sample` instances per class
+(reservoir sampling) and their per instance part is scaled to the count (the shared part is not: it exists once), so
+a report on a production heap costs a walk of gc.get_objects() plus a bounded amount of work per class. On Python
+3.11+ an object keeps its attributes inline until its __dict__ is read: reading it (to measure it) creates the dict,
+so the dict column is the size these dicts have once they exist, an upper bound. Only the sampled objects are
+touched.
+
+trace_workload(func) compares two tracemalloc snapshots, taken before and after func(), and returns the lines of code
+that allocated the most memory in between.
+"""
+
+import gc
+import random
+import sys
+import tracemalloc
+import types
+from collections import Counter
+
+SAMPLE = 2000  # instances measured per class
+_NOT_DATA = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+             types.CodeType, types.FrameType)
+
+
+class ClassFootprint:
+    def __init__(self, cls):
+        self.cls = cls
+        self.count = 0
+        self.samples = []
+        self.shallow = self.dict = self.deep = 0  # scaled to count
+        self.deep_shared = 0  # part of deep reached from several sampled instances, counted once
+        self.key_sharing = None  # part of the sampled instances with the usual attribute layout
+
+    @property
+    def name(self):
+        return self.cls.__module__ + '.' + self.cls.__qualname__
+
+    @property
+    def dict_overhead(self):
+        return self.dict / self.deep if self.deep else 0.0
+
+    def __repr__(self):
+        return 'ClassFootprint({}, count={}, deep={})'.format(self.name, self.count, self.deep)
+
+
+def _reach(obj, owner, reached, shared, roots):
+    """Walk the objects reachable from obj (sample number owner) that are not in reached yet
+
+    reached: {id: (size, id of the object it was first reached from, owner)}, in the order of discovery. An object
+    already reached from another sample goes in shared (not the sampled instances themselves, in roots).
+    """
+    stack = [obj]
+    parents = [None]
+    while stack:
+        obj = stack.pop()
+        parent = parents.pop()
+        entry = reached.get(id(obj))
+        if entry is not None:
+            if entry[2] != owner and id(obj) not in roots:
+                shared.add(id(obj))
+            continue
+        if isinstance(obj, _NOT_DATA):
+            continue
+        reached[id(obj)] = (sys.getsizeof(obj), parent, owner)
+        if isinstance(obj, dict):
+            children = [*obj.keys(), *obj.values()]
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            children = list(obj)
+        else:
+            children = [getattr(obj, slot) for slot in _slots(type(obj)) if getattr(obj, slot, None) is not None]
+            instance_dict = getattr(obj, '__dict__', None)
+            if isinstance(instance_dict, dict):
+                children.append(instance_dict)
+        stack.extend(children)
+        parents.extend([id(obj)] * len(children))
+
+
+def _slots(cls):
+    names = []
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    return [name for name in names if name not in ('__dict__', '__weakref__')]
+
+
+def _measure(footprint):
+    samples = footprint.samples
+    if not samples:
+        return
+    reached = {}
+    shared_ids = set()
+    roots = {id(obj) for obj in samples}
+    shallow = dict_size = 0
+    layouts = Counter()
+    for owner, obj in enumerate(samples):
+        shallow += sys.getsizeof(obj)
+        instance_dict = getattr(obj, '__dict__', None)
+        if isinstance(instance_dict, dict):
+            dict_size += sys.getsizeof(instance_dict)
+            layouts[tuple(instance_dict)] += 1
+        _reach(obj, owner, reached, shared_ids, roots)
+    deep = shared = 0
+    for key, (size, parent, _) in reached.items():  # an object comes after the one it was reached from
+        if key in shared_ids or parent in shared_ids:
+            shared_ids.add(key)
+            shared += size
+        else:
+            deep += size
+    scale = footprint.count / len(samples)
+    footprint.shallow = int(shallow * scale)
+    footprint.dict = int(dict_size * scale)
+    footprint.deep = int(deep * scale) + shared
+    footprint.deep_shared = shared
+    if layouts:
+        footprint.key_sharing = layouts.most_common(1)[0][1] / len(samples)
+
+
+def class_footprints(objects=None, classes=None, sample=SAMPLE, seed=0):
+    """{class: ClassFootprint} of the instances of user classes in objects (default: every object of gc)"""
+    generator = random.Random(seed)
+    if objects is None:
+        objects = gc.get_objects()  # the instances of classes with a __dict__ are all tracked by gc
+    if classes is not None:
+        classes = tuple(classes)
+    footprints = {}
+    for obj in objects:
+        cls = type(obj)
+        footprint = footprints.get(cls)
+        if footprint is None:
+            if (classes is not None and not issubclass(cls, classes)) or cls.__module__ == 'builtins' or \
+                    isinstance(obj, _NOT_DATA):
+                footprints[cls] = False  # not reported
+                continue
+            footprint = footprints[cls] = ClassFootprint(cls)
+        elif footprint is False:
+            continue
+        footprint.count += 1
+        if len(footprint.samples) < sample:
+            footprint.samples.append(obj)
+        else:
+            index = generator.randrange(footprint.count)  # reservoir sampling: every instance has the same chance
+            if index < sample:
+                footprint.samples[index] = obj
+    result = {}
+    for cls, footprint in footprints.items():
+        if footprint:
+            _measure(footprint)
+            footprint.samples = []  # do not keep the objects alive
+            result[cls] = footprint
+    return result
+
+
+def format_report(footprints, limit=20):
+    lines = ['{:<40} {:>9} {:>10} {:>10} {:>10} {:>8} {:>11}'.format(
+        'class', 'count', 'shallow', 'dict', 'deep', 'dict %', 'key sharing')]
+    for footprint in sorted(footprints.values(), key=lambda f: f.deep, reverse=True)[:limit]:
+        lines.append('{:<40} {:>9} {:>9.1f}M {:>9.1f}M {:>9.1f}M {:>7.1f}% {:>11}'.format(
+            footprint.name[-40:], footprint.count, footprint.shallow / 1e6, footprint.dict / 1e6,
+            footprint.deep / 1e6, footprint.dict_overhead * 100,
+            '-' if footprint.key_sharing is None else '{:.0%}'.format(footprint.key_sharing)))
+    return '\n'.join(lines)
+
+
+def trace_workload(func, *args, limit=10, key_type='lineno', frames=1):
+    """Run func(*args) between two tracemalloc snapshots, return (result, the limit biggest StatisticDiff)"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(frames)
+    try:
+        before = tracemalloc.take_snapshot()
+        result = func(*args)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started:
+            tracemalloc.stop()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), key_type)
+    return result, stats[:limit]
+
+
+# ======= BENCHMARK ======= #
+
+class Dog:  # Module 3
+    def __init__(self, named, age=0):
+        self.name = named
+        self.__age = age
+
+
+class Cat:  # Module 3
+    counter = 0
+
+    def __init__(self, namedd, age=0):
+        self.name = namedd
+        self.__age = age
+        Cat.counter += 1
+
+
+class Student:  # Module 3
+    def __init__(self, s_name, s_age, s_grade):
+        self.name = s_name
+        self.age = s_age
+        self.grade = s_grade
+
+
+if __name__ == '__main__':
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000  # dogs (tracemalloc makes the workload slow)
+
+    def workload():
+        dogs = [Dog('dog{}'.format(i), i % 15) for i in range(count)]
+        for dog in dogs[::10]:
+            dog.color = 'red'  # like dog1.color = 'red': these dicts have their own layout
+        cats = [Cat('cat{}'.format(i), 2) for i in range(count // 2)]
+        students = [Student('student{}'.format(i), 18 + i % 10, [i % 20, 10]) for i in range(count // 4)]
+        return dogs, cats, students
+
+    start = time.perf_counter()
+    population, top = trace_workload(workload)
+    print('workload under tracemalloc: {:.2f} s, biggest allocations:'.format(time.perf_counter() - start))
+    for stat in top[:5]:
+        print('   ', stat)
+
+    for sample in (1000, 10000, None):
+        start = time.perf_counter()
+        footprints = class_footprints(classes=(Dog, Cat, Student), sample=sample or count * 2)
+        print('\nclass_footprints(sample={}): {:.2f} s'.format(sample or 'all', time.perf_counter() - start))
+        print(format_report(footprints))
@@ -0,0 +1,137 @@
+# ======== MULTI PATTERN SEARCH (AHO-CORASICK) ========= #
+
+"""
+Module 2 searches one substring at a time:
+
+    a.find('hi', 10)     # first 'hi' from index 10
+    a.index('l')         # first 'l', ValueError if not found
+    a.rfind('l')         # last 'l'
+
+With thousands of patterns, a loop of str.find reads the whole text once per pattern. MultiPatternMatcher
+(Aho-Corasick) is built once from all the patterns, then reads the text a single time and reports every match of
+every pattern, overlapping ones included:
+
+    matcher = MultiPatternMatcher(['he', 'she', 'his', 'hers'])
+    list(matcher.finditer('ushers'))           # [(1, 'she'), (2, 'he'), (2, 'hers')]
+    matcher.find_all_first('ushers', 2)         # {'he': 2, 'she': -1, 'his': -1, 'hers': 2}, like find(p, 2)
+
+start / end work like str.find(sub, start, end): only matches completely inside text[start:end] are reported,
+positions are indexes in the whole text.
+
+The automaton is a trie of the patterns (one dict of transitions per node) plus a 'fail' link per node: the node
+of the longest suffix of the current text that is also a prefix of a pattern. On a mismatch the search follows the
+fail links instead of going back in the text.
+"""
+
+from collections import deque
+
+
+class MultiPatternMatcher:
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(patterns))  # no duplicates, order kept
+        if any(not pattern for pattern in self.patterns):
+            raise ValueError('empty patterns are not allowed')
+        self._goto = [{}]  # node -> {character: node}
+        self._fail = [0]
+        self._out = [()]  # node -> patterns ending here (directly or through fail links)
+        for pattern in self.patterns:
+            self._add(pattern)
+        self._link()
+
+    def _add(self, pattern):
+        node = 0
+        for character in pattern:
+            next_node = self._goto[node].get(character)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][character] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = next_node
+        self._out[node] = self._out[node] + (pattern,)
+
+    def _link(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())  # depth 1 nodes fail to the root
+        while queue:  # breadth first: the fail node of a node is always less deep, so already linked
+            node = queue.popleft()
+            for character, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and character not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(character, 0)
+                out[child] = out[child] + out[fail[child]]
+
+    def finditer(self, text, start=0, end=None):
+        """Yield (position, pattern) for every match inside text[start:end], ordered by end of match"""
+        start, end, _ = slice(start, end).indices(len(text))
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for index in range(start, end):
+            character = text[index]
+            while state and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            if out[state]:
+                for pattern in out[state]:
+                    yield index - len(pattern) + 1, pattern
+
+    def findall(self, text, start=0, end=None):
+        return list(self.finditer(text, start, end))
+
+    def find_all_first(self, text, start=0, end=None):
+        """{pattern: text.find(pattern, start, end)} for every pattern, in one pass"""
+        first = dict.fromkeys(self.patterns, -1)
+        missing = len(first)
+        for position, pattern in self.finditer(text, start, end):
+            if first[pattern] == -1:
+                first[pattern] = position
+                missing -= 1
+                if not missing:
+                    break
+        return first
+
+    def find_all_last(self, text, start=0, end=None):
+        """{pattern: text.rfind(pattern, start, end)} for every pattern, in one pass"""
+        last = dict.fromkeys(self.patterns, -1)
+        for position, pattern in self.finditer(text, start, end):
+            last[pattern] = position
+        return last
+
+    def count(self, text, start=0, end=None):
+        """{pattern: number of (overlapping) matches}"""
+        counts = dict.fromkeys(self.patterns, 0)
+        for _, pattern in self.finditer(text, start, end):
+            counts[pattern] += 1
+        return counts
+
+
+# ======= BENCHMARK ======= #
+
+if __name__ == '__main__':
+    import random
+    import string
+    import sys
+    import time
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1 << 20  # characters
+    random.seed(0)
+    text = ''.join(random.choices(string.ascii_lowercase[:8], k=size))
+    for pattern_count in (10, 100, 1000, 5000):
+        patterns = [''.join(random.choices(string.ascii_lowercase[:8], k=random.randint(5, 9)))
+                    for _ in range(pattern_count)]
+        start = time.perf_counter()
+        expected = {pattern: text.find(pattern, 10) for pattern in patterns}  # str.find loop
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = MultiPatternMatcher(patterns)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        result = matcher.find_all_first(text, 10)
+        search = time.perf_counter() - start
+        assert result == expected
+        print('{:>5} patterns, {} chars: str.find loop {:>7.3f} s | matcher build {:.3f} s + search {:.3f} s'.format(
+            pattern_count, size, loop, build, search))
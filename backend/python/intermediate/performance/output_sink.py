@@ -0,0 +1,194 @@
+# ======== BUFFERED OUTPUT SINK ========= #
+
+"""
+The Module 4 examples write everything with print, often one value per call:
+
+    for byte in byte_array:
+        print(hex(byte), end='')  # Read as hexadecimal
+
+print writes to sys.stdout, one of the three predefined streams. When stdout is a terminal it is line buffered:
+every line is a write system call (and with python -u, every print). open_sink() returns a text stream that keeps
+the text in a big buffer (1 MB by default) and sends it to its target (sys.stdout by default) in one write when:
+    - the buffer is full
+    - INTERVAL seconds have passed (a background thread flushes it, so the output of a slow program still shows up)
+    - the program exits (atexit), the sink is closed or flush() is called
+
+    with open_sink() as out:                  # the existing code only gets file=out
+        for byte in byte_array:
+            print(hex(byte), end='', file=out)
+
+    with buffered_stdout():                   # or no change at all: sys.stdout is the sink inside the block
+        hexdump_loop(byte_array)
+
+    sys.stdout = open_sink()                  # the whole program, flushed at exit
+
+The text is the one print would write: print calls sink.write with the same strings, the encoding, the errors
+handler and the newline translation are the ones of the target. line_buffering=True flushes at every line, for
+interactive use (a prompt must show up before input() waits); by default a sink is line buffered when its target is
+a terminal, like sys.stdout. Only the text written to the sink is kept in order: text written directly to the
+target while the sink holds some text comes out before it. Closing the sink does not close the target.
+
+The sink is a plain io.TextIOWrapper, as open() returns, on an io.BufferedWriter of buffer_size bytes writing to
+the file descriptor of the target: print and write run C code only. A subclass of TextIOWrapper or a Python
+write method would make every print slower than on a buffered stdout. A target without a file descriptor
+(io.StringIO) gets the full buffers through a small Python raw stream.
+"""
+
+import atexit
+import codecs
+import contextlib
+import io
+import sys
+import threading
+import time
+import weakref
+
+BUFFER_SIZE = 1 << 20
+INTERVAL = 1.0  # seconds the text can stay in the buffer, None: no time flush
+
+_OPEN_SINKS = weakref.WeakSet()  # flushed at exit
+
+
+class _Forward(io.RawIOBase):
+    """Raw stream writing the bytes of the sink, decoded, to a text stream without file descriptor"""
+
+    def __init__(self, target, encoding, errors):
+        super().__init__()
+        self.target = target
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors)
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.target.write(self.decoder.decode(bytes(data)))
+        self.target.flush()
+        return len(data)
+
+    def isatty(self):
+        return self.target.isatty()
+
+
+def _file_descriptor(stream):
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):  # io.UnsupportedOperation is an OSError and a ValueError
+        return None
+
+
+def _flush_every(sink_ref, interval):
+    while True:
+        time.sleep(interval)
+        sink = sink_ref()
+        if sink is None or sink.closed:
+            return
+        try:
+            sink.flush()
+        except ValueError:  # closed meanwhile
+            return
+        del sink  # the thread must not keep the sink alive
+
+
+def open_sink(target=None, buffer_size=BUFFER_SIZE, interval=INTERVAL, line_buffering=None):
+    """Text stream batching its writes to target (default sys.stdout) in a buffer of buffer_size bytes"""
+    if buffer_size < 1:
+        raise ValueError('buffer_size must be positive, got {}'.format(buffer_size))
+    if interval is not None and interval <= 0:
+        raise ValueError('interval must be positive or None, got {}'.format(interval))
+    target = sys.stdout if target is None else target
+    encoding = getattr(target, 'encoding', None) or 'utf-8'
+    errors = getattr(target, 'errors', None) or 'strict'
+    if line_buffering is None:
+        line_buffering = target.isatty()
+    target.flush()  # what the target already holds comes first
+    descriptor = _file_descriptor(target)
+    if descriptor is not None:
+        raw = io.FileIO(descriptor, 'w', closefd=False)
+        newline = None  # '\n' written as os.linesep, like sys.stdout
+    else:
+        raw = _Forward(target, encoding, errors)
+        newline = '\n'  # the target translates
+    sink = io.TextIOWrapper(io.BufferedWriter(raw, buffer_size), encoding, errors, newline,
+                            line_buffering=line_buffering)
+    sink.target = target  # the file descriptor stays open while the sink lives
+    if interval is not None:
+        threading.Thread(target=_flush_every, args=(weakref.ref(sink), interval), daemon=True,
+                         name='output sink flush').start()
+    _OPEN_SINKS.add(sink)
+    return sink
+
+
+@atexit.register
+def _flush_at_exit():
+    for sink in list(_OPEN_SINKS):
+        if not sink.closed:
+            sink.flush()
+
+
+@contextlib.contextmanager
+def buffered_stdout(buffer_size=BUFFER_SIZE, interval=INTERVAL, line_buffering=None):
+    """sys.stdout is a sink on the current sys.stdout inside the with block"""
+    sink = open_sink(sys.stdout, buffer_size, interval, line_buffering)
+    try:
+        with contextlib.redirect_stdout(sink):
+            yield sink
+    finally:
+        sink.close()
+
+
+# ======= BENCHMARK ======= #
+
+def _print_hex(byte_array, out):  # Module 4
+    for byte in byte_array:
+        print(hex(byte), end='', file=out)
+
+
+def _print_lines(byte_array, out):  # one value per line, like print(byte)
+    for byte in byte_array:
+        print(byte, file=out)
+
+
+if __name__ == '__main__':
+    import os
+    import tempfile
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000  # writes
+    byte_array = os.urandom(count)
+
+    def run(label, loop, make_stream):
+        with make_stream() as out:  # closed (so flushed) inside the measure
+            start = time.perf_counter()
+            loop(byte_array, out)
+            out.flush()
+        elapsed = time.perf_counter() - start
+        print('    {:<52} {:>7.2f} s  {:>6.0f} ns per print'.format(label, elapsed, elapsed / count * 1e9))
+
+    terminal = open(os.devnull, 'w', buffering=1)
+    streams = [
+        ('print, stdout to a terminal (line buffered)', lambda: open(os.devnull, 'w', buffering=1)),
+        ('print, stdout to a file or pipe (8 KB buffer)', lambda: open(os.devnull, 'w')),
+        ('print, python -u (unbuffered)', lambda: io.TextIOWrapper(io.FileIO(os.devnull, 'w'), write_through=True)),
+        ('print, open_sink (1 MB buffer)', lambda: open_sink(terminal, line_buffering=False)),
+        ('print, open_sink line_buffering=True', lambda: open_sink(terminal, line_buffering=True)),
+    ]
+    for label, loop in [("print(hex(byte), end='')", _print_hex), ('print(byte)', _print_lines)]:
+        print('{} x {}'.format(label, count))
+        for stream_label, make_stream in streams:
+            run(stream_label, loop, make_stream)
+
+    expected, got = io.StringIO(), io.StringIO()
+    _print_hex(byte_array[:100000], expected)
+    _print_lines(byte_array[:100000], expected)
+    with open_sink(got, buffer_size=4096) as sink:
+        _print_hex(byte_array[:100000], sink)
+        _print_lines(byte_array[:100000], sink)
+        sink.flush()
+        assert got.getvalue() == expected.getvalue()
+    with tempfile.TemporaryDirectory() as tmp:  # same bytes through a file descriptor, with stdout replaced
+        path = os.path.join(tmp, 'out.txt')
+        with open(path, 'w', encoding='utf-8') as stream, contextlib.redirect_stdout(stream):
+            with buffered_stdout():
+                _print_hex(byte_array[:100000], None)
+                _print_lines(byte_array[:100000], None)
+        with open(path, encoding='utf-8', newline='') as stream:
+            assert stream.read() == expected.getvalue().replace('\n', os.linesep)
@@ -0,0 +1,110 @@
+# ======== PARALLEL APPLY_FUNC ========= #
+
+"""
+apply_func of Module 4 calls func on every element, one after the other:
+
+    def apply_func(elements, func):
+        for element in elements:
+            print(func(element))
+
+For a CPU heavy func the other cores do nothing. parallel_apply cuts the elements into chunks and sends them to a
+ProcessPoolExecutor. The results come back in the order of the elements.
+
+Chunk size: sending one element at a time to a process costs more than a cheap func itself, so the first few
+elements are run here first to measure the cost of one call. The chunk size is chosen so one chunk takes about
+target_chunk_seconds, and when the whole job would take less than min_parallel_seconds it stays serial.
+
+func and the elements are sent to other processes: they must be picklable (a function defined at module level,
+not a lambda).
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SAMPLE_SIZE = 8
+TARGET_CHUNK_SECONDS = 0.05
+MIN_PARALLEL_SECONDS = 0.2
+
+
+def apply_func(elements, func):
+    """Serial version (Module 4), returning the results instead of printing them"""
+    return [func(element) for element in elements]
+
+
+def _run_chunk(func, chunk):
+    return [func(element) for element in chunk]
+
+
+def choose_chunk_size(seconds_per_item, count, workers, target_chunk_seconds=TARGET_CHUNK_SECONDS):
+    """Enough items for one chunk to last target_chunk_seconds, but at least 4 chunks per worker to balance the load"""
+    size = int(target_chunk_seconds / seconds_per_item) if seconds_per_item > 0 else count
+    return max(1, min(size, count // (workers * 4) or 1))
+
+
+def parallel_apply(elements, func, workers=None, chunk_size=None, executor=None,
+                   target_chunk_seconds=TARGET_CHUNK_SECONDS, min_parallel_seconds=MIN_PARALLEL_SECONDS):
+    """Return [func(element) for element in elements], computed by a pool of processes
+
+    workers is the number of processes (the size of executor when one is given, to reuse a running pool)
+    """
+    elements = list(elements)
+    workers = workers or os.cpu_count() or 1
+
+    # measure the cost of func on the first elements, their results are kept
+    sample = elements[:SAMPLE_SIZE]
+    start = time.perf_counter()
+    results = [func(element) for element in sample]
+    seconds_per_item = (time.perf_counter() - start) / max(len(sample), 1)
+    rest = elements[len(sample):]
+
+    if not rest:
+        return results
+    if workers == 1 or seconds_per_item * len(rest) < min_parallel_seconds:
+        results.extend(func(element) for element in rest)  # tiny job: the pool would cost more than it saves
+        return results
+
+    if chunk_size is None:
+        chunk_size = choose_chunk_size(seconds_per_item, len(rest), workers, target_chunk_seconds)
+    chunks = [rest[i:i + chunk_size] for i in range(0, len(rest), chunk_size)]
+    if executor is not None:
+        for chunk_results in executor.map(_run_chunk, [func] * len(chunks), chunks):  # map keeps the order
+            results.extend(chunk_results)
+        return results
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_results in pool.map(_run_chunk, [func] * len(chunks), chunks):
+            results.extend(chunk_results)
+    return results
+
+
+# ======= BENCHMARK ======= #
+
+def _cpu_heavy(n):
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+if __name__ == '__main__':
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    elements = [20000 + i % 100 for i in range(count)]
+    start = time.perf_counter()
+    expected = apply_func(elements, _cpu_heavy)
+    serial = time.perf_counter() - start
+    print('{} elements, {} cores available'.format(count, os.cpu_count()))
+    print('  serial apply_func   {:>7.3f} s'.format(serial))
+    for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pool.submit(int).result()  # start the pool outside of the measure
+            start = time.perf_counter()
+            result = parallel_apply(elements, _cpu_heavy, workers, executor=pool)
+            elapsed = time.perf_counter() - start
+        assert result == expected
+        print('  parallel, {:>2} cores {:>7.3f} s  speedup x{:.2f}'.format(workers, elapsed, serial / elapsed))
+
+    start = time.perf_counter()
+    parallel_apply(range(100), abs)  # tiny input: serial fallback, no pool started
+    print('  tiny input          {:>7.5f} s'.format(time.perf_counter() - start))
@@ -0,0 +1,165 @@
+# ======== FUSED LAZY PIPELINE ========= #
+
+"""
+Module 4 chains map / filter / lambda:
+
+    print(list(map(lambda_func, mylist)))
+    print(list(filter(lambda a: a % 2 == 0, [1, 2, 3, 4, 5, 6, 7, 8, 9, 10])))
+    apply_func([1, 2, 3, 4, 5], func_l)
+
+Each list() makes a full pass and a full copy before the next step can start. Pipeline records the steps and runs
+them all in one loop over the source, nothing is materialized until you ask for it:
+
+    evens = Pipeline(range(1, 11)).filter(lambda a: a % 2 == 0).map(lambda i: i * 2)
+    next(evens)        # 4, like next(map(...)): a Pipeline is an iterator
+    evens.list()       # [8, 12, 16, 20], the rest of the items
+    Pipeline(data).map(parse).take(1000).batch(100)   # lists of 100 items
+
+Consecutive map / filter / take steps are fused: the pipeline writes the source of one generator function with one
+line per step (x = f0(x), if not f1(x): continue, ...) and compiles it once. Every item goes through all the steps
+in the same loop iteration, without one iterator object per step in between.
+batch() cuts the fused loop in two: the steps after a batch work on the lists.
+"""
+
+from itertools import islice
+
+_MAP, _FILTER, _TAKE, _BATCH = 'map', 'filter', 'take', 'batch'
+
+
+def _compile_segment(steps):
+    """Build one generator function running the map / filter / take steps in a single loop"""
+    namespace = {}
+    setup = []
+    body = []
+    has_take = any(kind == _TAKE for kind, _ in steps)
+    # with a take step, a filtered out item must still end the loop once the take is complete
+    skip = ['if stop:', '    return', 'continue'] if has_take else ['continue']
+    for i, (kind, arg) in enumerate(steps):
+        name = 'f{}'.format(i)
+        namespace[name] = arg
+        if kind == _MAP:
+            body.append('x = {}(x)'.format(name))
+        elif kind == _FILTER:
+            body.append('if not {}(x):'.format(name))
+            body.extend('    ' + line for line in skip)
+        else:  # take: count the items reaching this step, stop after the last one without pulling another item
+            setup.extend(['if {} <= 0:'.format(name), '    return', 'taken{} = 0'.format(i)])
+            body.extend(['taken{} += 1'.format(i), 'if taken{} >= {}:'.format(i, name), '    stop = True'])
+    body.append('yield x')
+    if has_take:
+        setup.append('stop = False')
+        body.extend(['if stop:', '    return'])
+    lines = (['def fused(source):'] + ['    ' + line for line in setup] + ['    for x in source:'] +
+             ['        ' + line for line in body])
+    source = '\n'.join(lines)
+    exec(compile(source, '<pipeline>', 'exec'), namespace)
+    return namespace['fused'], source
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+class Pipeline:
+    def __init__(self, source, steps=()):
+        self._source = source
+        self._steps = tuple(steps)
+        self._iterator = None  # built on the first next()
+
+    def _then(self, kind, arg):
+        if self._iterator is not None:
+            raise RuntimeError('the pipeline has already started, add the steps before iterating')
+        return Pipeline(self._source, self._steps + ((kind, arg),))
+
+    def map(self, func):
+        return self._then(_MAP, func)
+
+    def filter(self, predicate):
+        return self._then(_FILTER, predicate)
+
+    def take(self, n):
+        """Keep only the first n items reaching this step"""
+        if n < 0:
+            raise ValueError('n must be positive')
+        return self._then(_TAKE, n)
+
+    def batch(self, size):
+        """Group the items into lists of size items (the last one can be shorter)"""
+        if size <= 0:
+            raise ValueError('size must be positive')
+        return self._then(_BATCH, size)
+
+    def _build(self):
+        iterator = self._source
+        segment = []
+        for kind, arg in self._steps + ((_BATCH, None),):  # the final batch step only flushes the last segment
+            if kind != _BATCH:
+                segment.append((kind, arg))
+                continue
+            if segment:
+                fused, _ = _compile_segment(segment)
+                iterator = fused(iterator)
+                segment = []
+            if arg is not None:
+                iterator = _batches(iterator, arg)
+        return iter(iterator)
+
+    def __iter__(self):
+        # hand out the fused generator itself: a for loop or list() then runs without a Python call per item,
+        # and it shares its position with next(pipeline)
+        if self._iterator is None:
+            self._iterator = self._build()
+        return self._iterator
+
+    def __next__(self):
+        if self._iterator is None:
+            self._iterator = self._build()
+        return next(self._iterator)
+
+    def list(self):
+        return list(iter(self))
+
+    def __repr__(self):
+        steps = ''.join('.{}({!r})'.format(kind, arg) for kind, arg in self._steps)
+        return 'Pipeline({!r}){}'.format(self._source, steps)
+
+
+# ======= BENCHMARK ======= #
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000000
+    print('map -> filter -> map over', count, 'items')
+    mylist = list(range(count))
+    lambda_func = lambda i: i * 2
+    is_even = lambda a: a % 3 == 0
+    func_l = lambda a: a + 1
+
+    def apply_func(elements, func):  # Module 4 version, returning instead of printing
+        return [func(element) for element in elements]
+
+    candidates = [
+        ('list() after every step', lambda: apply_func(list(filter(is_even, list(map(lambda_func, mylist)))), func_l)),
+        ('nested map/filter', lambda: list(map(func_l, filter(is_even, map(lambda_func, mylist))))),
+        ('Pipeline', lambda: Pipeline(mylist).map(lambda_func).filter(is_even).map(func_l).list()),
+        ('nested + islice(1000)', lambda: list(islice(map(func_l, filter(is_even, map(lambda_func, mylist))), 1000))),
+        ('Pipeline take(1000)',
+         lambda: Pipeline(mylist).map(lambda_func).filter(is_even).map(func_l).take(1000).list()),
+        ('Pipeline batch(1000)',
+         lambda: Pipeline(mylist).map(lambda_func).filter(is_even).map(func_l).batch(1000).list()),
+    ]
+    expected = candidates[0][1]()
+    for label, func in candidates:
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        if 'batch' in label:
+            result = [item for batch in result for item in batch]
+        assert result == expected[:len(result)]
+        print('{:<24} {:>7.3f} s'.format(label, elapsed))
@@ -0,0 +1,277 @@
+# ======== THREAD SAFE INSTANCE COUNTER ========= #
+
+"""
+Cat of Module 3 counts its instances with a class variable:
+
+    class Cat:
+        counter = 0
+
+        def __init__(self, namedd, age=0):
+            ...
+            Cat.counter += 1
+
+'Cat.counter += 1' is read, add, write: two threads can read the same value and one increment is lost. A global lock
+fixes that, but then every thread waits on the same lock.
+
+ShardedCounter gives every thread its own shard (a one element list only that thread writes), and adds the shards
+together when the counter is read. It replaces the class variable without touching __init__:
+
+    class Cat:
+        counter = ShardedCounter()
+
+        def __init__(self, namedd, age=0):
+            ...
+            Cat.counter += 1       # __iadd__ adds to the shard of the current thread and returns the same counter
+
+    print(Cat.counter, cat1.counter)   # 2 2, reads like an int (==, <, +, int(), format, ...)
+    Cat.counter + 1                    # 3, an int: the arithmetic works on the current value
+
+When a thread ends, its shard is given back: its count is added to the base shard (or, with shared=True, the slot
+is reused as is by the next thread), so threads that come and go do not make the counter grow. Like a mutable
+object that compares by value, a counter is not hashable.
+
+With shared=True the shards live in shared memory (multiprocessing.RawArray), so processes forked after the counter
+was created add to the same total. The number of shards is then fixed (max_shards): it limits the threads that
+increment at the same time, in all the processes. A process that ends with os._exit (multiprocessing children) does
+not give back the slot of its main thread.
+"""
+
+import functools
+import multiprocessing
+import operator
+import os
+import threading
+import weakref
+
+DEFAULT_MAX_SHARDS = 256
+
+_counters = weakref.WeakValueDictionary()  # id -> counter (counters are not hashable)
+
+
+def _after_fork_in_child():
+    # a forked child inherits the thread local of the forking thread: forget it so the child claims its own shard
+    for counter in list(_counters.values()):
+        counter._local = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class _Owner:
+    """Kept in the thread local of a thread: gives the shard back when the thread ends (or forgets the local)"""
+    __slots__ = ('release', 'shard', 'pid')
+
+    def __init__(self, release, shard):
+        self.release = release
+        self.shard = shard
+        self.pid = os.getpid()
+
+    def __del__(self):
+        if self.pid == os.getpid():  # a forked child drops the local of its parent: the shard is not its own
+            self.release(self.shard)
+
+
+@functools.total_ordering
+class ShardedCounter:
+    def __init__(self, value=0, shared=False, max_shards=DEFAULT_MAX_SHARDS):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # only taken when a thread creates or gives back its shard, and on reads
+        self._shared = shared
+        if shared:
+            self._slots = multiprocessing.RawArray('q', max_shards)  # 64 bit signed int per shard
+            self._in_use = multiprocessing.RawArray('b', max_shards)  # slot 0 holds the initial value
+            self._slot_lock = multiprocessing.Lock()
+            self._slots[0] = value
+            self._in_use[0] = 1
+        else:
+            self._base = value  # the initial value and the counts of the ended threads
+            self._cells = {}  # id(cell) -> cell of a live thread (cells compare by value, never search them)
+        _counters[id(self)] = self
+
+    def _claim_shard(self):
+        if self._shared:
+            with self._slot_lock:
+                index = bytes(self._in_use).find(0)
+                if index == -1:
+                    raise RuntimeError('all {} shards are in use, raise max_shards'.format(len(self._slots)))
+                self._in_use[index] = 1
+            self._local.index = index  # the slot keeps the count of its previous threads: it is only added to
+            self._local.owner = _Owner(self._release_shard, index)
+            return index
+        cell = [0]
+        with self._lock:
+            self._cells[id(cell)] = cell
+        self._local.cell = cell
+        self._local.owner = _Owner(self._release_shard, cell)
+        return cell
+
+    def _release_shard(self, shard):
+        if self._shared:
+            with self._slot_lock:
+                self._in_use[shard] = 0
+            return
+        with self._lock:
+            self._base += shard[0]
+            del self._cells[id(shard)]
+
+    def increment(self, n=1):
+        if self._shared:
+            try:
+                index = self._local.index
+            except AttributeError:  # first increment of this thread
+                index = self._claim_shard()
+            self._slots[index] += n  # only this thread of this process writes this slot
+        else:
+            try:
+                cell = self._local.cell
+            except AttributeError:
+                cell = self._claim_shard()
+            cell[0] += n  # only this thread writes this cell
+
+    @property
+    def value(self):
+        if self._shared:
+            return sum(self._slots)
+        with self._lock:  # a shard given back moves to the base under the lock: counted once
+            return self._base + sum(cell[0] for cell in self._cells.values())
+
+    def __iadd__(self, n):
+        self.increment(n)
+        return self
+
+    def __isub__(self, n):
+        self.increment(-n)
+        return self
+
+    def __int__(self):
+        return self.value
+
+    __index__ = __int__
+
+    def __bool__(self):
+        return self.value != 0
+
+    def __eq__(self, other):
+        return self.value == _plain(other)
+
+    def __lt__(self, other):
+        return self.value < _plain(other)
+
+    __hash__ = None  # equal to its value, which changes
+
+    def __str__(self):
+        return str(self.value)
+
+    def __format__(self, spec):
+        return format(self.value, spec)
+
+    def __repr__(self):
+        return 'ShardedCounter({})'.format(self.value)
+
+    def __getstate__(self):
+        raise TypeError('ShardedCounter is shared by fork, it can not be pickled')
+
+
+def _plain(value):
+    return value.value if isinstance(value, ShardedCounter) else value
+
+
+def _on_value(name):
+    """ShardedCounter method doing the int operation name on the current value: Cat.counter + 1 is an int"""
+    operation = getattr(operator, name, None) or getattr(int, name)
+
+    def method(self, *args):
+        return operation(self.value, *map(_plain, args))
+
+    method.__name__ = name
+    return method
+
+
+for _name in ('__add__', '__sub__', '__mul__', '__truediv__', '__floordiv__', '__mod__', '__pow__', '__divmod__',
+              '__radd__', '__rsub__', '__rmul__', '__rtruediv__', '__rfloordiv__', '__rmod__', '__rpow__',
+              '__rdivmod__', '__neg__', '__pos__', '__abs__', '__float__'):
+    setattr(ShardedCounter, _name, _on_value(_name))
+
+
+class LockedCounter:
+    """The simple fix: one counter, one global lock (for comparison)"""
+
+    def __init__(self, value=0):
+        self._value = value
+        self._lock = threading.Lock()
+
+    def __iadd__(self, n):
+        with self._lock:
+            self._value += n
+        return self
+
+    @property
+    def value(self):
+        return self._value
+
+    def __int__(self):
+        return self._value
+
+    def __str__(self):
+        return str(self._value)
+
+
+# ======= BENCHMARK ======= #
+
+def _make_cat_class(counter):
+    class Cat:
+        def __init__(self, namedd, age=0):
+            self.name = namedd
+            self.__age = age
+            Cat.counter += 1
+
+    Cat.counter = counter
+    return Cat
+
+
+def _run(cat_class, threads, per_thread):
+    import sys
+    import time
+
+    def work():
+        for _ in range(per_thread):
+            cat_class('matou', 2)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # switch threads very often to expose the race of a plain int
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    sys.setswitchinterval(interval)
+    return int(cat_class.counter), elapsed
+
+
+if __name__ == '__main__':
+    import sys
+
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    expected = threads * per_thread
+    print(threads, 'threads x', per_thread, 'Cat objects, expected counter =', expected)
+    counters = [('int class variable', 0), ('global lock', LockedCounter()), ('ShardedCounter', ShardedCounter()),
+                ('ShardedCounter shared', ShardedCounter(shared=True))]
+    for label, counter in counters:
+        count, elapsed = _run(_make_cat_class(counter), threads, per_thread)
+        print('  {:<22} counter={:<9} lost={:<7} {:>6.2f} s  {:>9.0f} objects/s'.format(
+            label, count, expected - count, elapsed, expected / elapsed))
+
+    # processes forked after creation add to the same shared counter
+    shared = ShardedCounter(shared=True)
+    Cat = _make_cat_class(shared)
+    processes = [multiprocessing.get_context('fork').Process(target=lambda: [Cat('matou') for _ in range(1000)])
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    print('4 processes x 1000 Cat objects, shared counter =', Cat.counter)
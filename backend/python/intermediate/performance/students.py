@@ -0,0 +1,159 @@
+# ======== COMPACT STUDENT STORAGE ========= #
+
+"""
+Student of Module 3 keeps name, age and grade in the __dict__ of every instance. A dict per object is expensive
+when there are millions of students. Two cheaper layouts:
+
+    SlottedStudent  same class with __slots__: no __dict__, the 3 attributes are stored in fixed slots
+    StudentTable    columnar storage: ages and grades in array.array columns (raw C integers), names in one list
+                    of interned strings. Rows are handed out as small StudentRow views (table + index) with the same
+                    attributes and introduce() method as Student.
+
+A StudentRow does not copy anything, it reads the columns of its table: changing row.age changes the table.
+"""
+
+import sys
+from array import array
+
+AGE_TYPECODE = 'H'  # unsigned short: 0 .. 65535
+GRADE_TYPECODE = 'i'  # signed int
+
+
+class Student:  # same as Module 3
+    def __init__(self, s_name, s_age, s_grade):
+        self.name = s_name
+        self.age = s_age
+        self.grade = s_grade
+
+    def introduce(self):
+        print('Hello i\'m a student, my name is', self.name, 'my grade is', self.grade, 'and i\'m', self.age)
+
+
+class SlottedStudent:
+    __slots__ = ('name', 'age', 'grade')  # no __dict__, can't add other attributes
+
+    def __init__(self, s_name, s_age, s_grade):
+        self.name = s_name
+        self.age = s_age
+        self.grade = s_grade
+
+    def introduce(self):
+        print('Hello i\'m a student, my name is', self.name, 'my grade is', self.grade, 'and i\'m', self.age)
+
+
+class StudentRow:
+    """Lightweight view on one row of a StudentTable"""
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    @property
+    def name(self):
+        return self._table.names[self._index]
+
+    @name.setter
+    def name(self, value):
+        self._table.names[self._index] = sys.intern(value)
+
+    @property
+    def age(self):
+        return self._table.ages[self._index]
+
+    @age.setter
+    def age(self, value):
+        self._table.ages[self._index] = value
+
+    @property
+    def grade(self):
+        return self._table.grades[self._index]
+
+    @grade.setter
+    def grade(self, value):
+        self._table.grades[self._index] = value
+
+    def introduce(self):
+        print('Hello i\'m a student, my name is', self.name, 'my grade is', self.grade, 'and i\'m', self.age)
+
+    def __repr__(self):
+        return 'StudentRow({!r}, {!r}, {!r})'.format(self.name, self.age, self.grade)
+
+    def __eq__(self, other):
+        if not isinstance(other, StudentRow):
+            return NotImplemented
+        return (self.name, self.age, self.grade) == (other.name, other.age, other.grade)
+
+
+class StudentTable:
+    """Students stored column by column"""
+
+    def __init__(self, rows=(), age_typecode=AGE_TYPECODE, grade_typecode=GRADE_TYPECODE):
+        self.names = []
+        self.ages = array(age_typecode)
+        self.grades = array(grade_typecode)
+        self.extend(rows)
+
+    @classmethod
+    def from_students(cls, students, **kwargs):
+        """Build a table from objects with name, age and grade attributes (Student, SlottedStudent, ...)"""
+        return cls(((s.name, s.age, s.grade) for s in students), **kwargs)
+
+    def append(self, name, age, grade):
+        self.names.append(sys.intern(name))  # equal names share one string object
+        self.ages.append(age)
+        self.grades.append(grade)
+
+    def extend(self, rows):
+        """Append (name, age, grade) tuples"""
+        for name, age, grade in rows:
+            self.append(name, age, grade)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('StudentTable index out of range')
+        return StudentRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield StudentRow(self, index)
+
+    def rows(self):
+        """Iterate (name, age, grade) tuples without creating views"""
+        return zip(self.names, self.ages, self.grades)
+
+
+# ======= BENCHMARK ======= #
+
+def _measure(label, build, count):
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    data = build(count)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:<16} {:>8.1f} MB  {:>6.1f} bytes/row  (peak {:.1f} MB)'.format(label, current / 1e6, current / count,
+                                                                          peak / 1e6))
+    return data
+
+
+def _sample_rows(count):
+    first_names = ['ridi', 'anna', 'marc', 'lea', 'tom', 'sara', 'paul', 'ines']
+    for i in range(count):
+        yield first_names[i % len(first_names)] + str(i % 1000), 18 + i % 10, i % 20
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print('memory for', count, 'students (names included)')
+    _measure('Student', lambda n: [Student(*row) for row in _sample_rows(n)], count)
+    _measure('SlottedStudent', lambda n: [SlottedStudent(*row) for row in _sample_rows(n)], count)
+    table = _measure('StudentTable', lambda n: StudentTable(_sample_rows(n)), count)
+    table[1].introduce()
@@ -0,0 +1,386 @@
+# ======== SUFFIX ARRAY INDEX ========= #
+
+"""
+find / rfind / index of Module 2 read the text from the start every time they are called. When the same big text
+is searched again and again, SuffixIndex sorts all the suffixes of the text once (suffix array), then every query
+is a binary search: about log2(len(text)) comparisons of len(pattern) characters.
+
+    index = SuffixIndex(a)
+    index.find('hi', 10)        # same answers as a.find / a.rfind / a.index / a.rindex
+    index.rfind('l')
+    index.count_overlapping('aa', 0, 15)   # 'aa' is 2 times in 'aaa' (str.count does not overlap and says 1)
+    index.findall('l', 0, 15)   # every position, sorted
+
+All the suffixes starting with a pattern are next to each other in the suffix array, so the occurrences are one
+range [lo, hi) found by two binary searches:
+    - count_overlapping     hi - lo
+    - find / rfind          smallest / largest position in the range: a table of block minima / maxima answers
+                            it without reading the whole range (built on the first call)
+    - with start / end      the positions of the range inside the window: a small range is scanned, a big one is
+                            answered by a merge sort tree (the suffix array with every run of BLOCK << k entries
+                            sorted, for every level k), one bisect in each of the O(log n) runs covering the range.
+                            The tree is built on the first windowed query of a frequent pattern and takes about
+                            log2(len(text) / BLOCK) times the memory of the suffix array
+
+save(path) writes the text and the suffix array; SuffixIndex.load(path) maps the file in memory (mmap), the suffix
+array is used where it is, only the text is decoded.
+
+The text can be str (positions in characters) or bytes (positions in bytes, load it with SuffixIndex.from_file).
+Building uses prefix doubling: O(n log n) sorts, a few seconds per MB in pure Python.
+"""
+
+import mmap
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+_MAGIC = b'SUFIX001'
+_HEADER = struct.Struct('<8sBBxxxxxxQQ')  # magic, is_bytes, itemsize, len(text), len(encoded text)
+BLOCK = 64  # suffix array entries per block of the minima / maxima tables and of the merge sort tree
+SCAN_LIMIT = 64  # windowed query: scan the range when it has at most this many occurrences
+
+
+def _typecode(n):
+    return 'i' if n < 2 ** 31 else 'q'
+
+
+def build_suffix_array(text):
+    """Positions of the suffixes of text in sorted order (prefix doubling)"""
+    n = len(text)
+    sa = sorted(range(n), key=text.__getitem__)  # sorted by the first character
+    rank = [0] * n
+    r = 0
+    previous = None
+    for i in sa:
+        if text[i] != previous:
+            r += 1
+            previous = text[i]
+        rank[i] = r  # ranks start at 1, 0 means 'after the end of the text'
+    k = 1
+    while r < n:  # suffixes sorted by their first 2k characters, until all the ranks are different
+        second = rank[k:] + [0] * min(k, n)
+        keys = [a * (n + 1) + b for a, b in zip(rank, second)]
+        sa.sort(key=keys.__getitem__)
+        r = 0
+        previous = -1
+        for i in sa:
+            if keys[i] != previous:
+                r += 1
+                previous = keys[i]
+            rank[i] = r
+        k *= 2
+    return array(_typecode(n), sa)
+
+
+class _SparseTable:
+    """Minimum (or maximum) of any range of a list in O(1) after an O(n log n) build"""
+
+    def __init__(self, values, function):
+        self.function = function
+        self.levels = [list(values)]
+        width = 1
+        while 2 * width <= len(values):
+            last = self.levels[-1]
+            self.levels.append([function(last[i], last[i + width]) for i in range(len(last) - width)])
+            width *= 2
+
+    def query(self, lo, hi):
+        """function of values[lo:hi], hi > lo"""
+        level = (hi - lo).bit_length() - 1
+        row = self.levels[level]
+        return self.function(row[lo], row[hi - (1 << level)])
+
+
+class _MergeTree:
+    """The positions of sa[lo:hi] inside a window, with a bisect in O(log n) sorted runs
+
+    levels[k] is the suffix array with every run of BLOCK << k entries sorted. A range of whole blocks is covered by
+    at most 2 runs per level.
+    """
+
+    def __init__(self, sa):
+        n = len(sa)
+        typecode = _typecode(n)
+        width = BLOCK
+        level = array(typecode)
+        for i in range(0, n, width):
+            level.extend(sorted(sa[i:i + width]))
+        self.levels = [level]
+        while width < n:
+            width *= 2
+            previous = level
+            level = array(typecode)
+            for i in range(0, n, width):
+                level.extend(sorted(previous[i:i + width]))  # two sorted runs: sorted() merges them
+            self.levels.append(level)
+
+    def runs(self, first_block, last_block):
+        """(level, lo, hi) of the sorted runs covering the blocks [first_block, last_block)"""
+        k = 0
+        while first_block < last_block:
+            width = BLOCK << k
+            if first_block & 1:
+                yield self.levels[k], first_block * width, (first_block + 1) * width
+                first_block += 1
+            if last_block & 1:
+                last_block -= 1
+                yield self.levels[k], last_block * width, (last_block + 1) * width
+            first_block >>= 1
+            last_block >>= 1
+            k += 1
+
+
+class SuffixIndex:
+    def __init__(self, text, suffix_array=None):
+        self.text = text
+        self._sa = build_suffix_array(text) if suffix_array is None else suffix_array
+        self._tables = None  # block minima / maxima, built on the first find / rfind
+        self._tree = None  # merge sort tree, built on the first windowed query of a frequent pattern
+        self._mmap = None
+
+    @classmethod
+    def from_file(cls, path, encoding=None):
+        """Index the content of a file: bytes, or str when encoding is given"""
+        with open(path, 'rb') as stream:
+            data = stream.read()
+        return cls(data.decode(encoding) if encoding else data)
+
+    def __len__(self):
+        return len(self.text)
+
+    # ----- queries -----
+
+    def _range(self, pattern):
+        """[lo, hi) of the suffix array entries starting with pattern"""
+        text, sa, m = self.text, self._sa, len(pattern)
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] < pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        left, hi = lo, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if text[sa[mid]:sa[mid] + m] <= pattern:
+                lo = mid + 1
+            else:
+                hi = mid
+        return left, lo
+
+    def _build_tables(self):
+        sa = self._sa
+        minima = [min(sa[i:i + BLOCK]) for i in range(0, len(sa), BLOCK)]
+        maxima = [max(sa[i:i + BLOCK]) for i in range(0, len(sa), BLOCK)]
+        self._tables = _SparseTable(minima, min), _SparseTable(maxima, max)
+
+    def _extreme(self, lo, hi, which):
+        """Smallest (which=0) or largest (which=1) position in sa[lo:hi]"""
+        if self._tables is None:
+            self._build_tables()
+        table = self._tables[which]
+        function = table.function
+        sa = self._sa
+        first_block = -(-lo // BLOCK)  # blocks completely inside [lo, hi)
+        last_block = hi // BLOCK
+        if first_block >= last_block:
+            return function(sa[lo:hi])
+        best = table.query(first_block, last_block)
+        if lo < first_block * BLOCK:
+            best = function(best, function(sa[lo:first_block * BLOCK]))
+        if last_block * BLOCK < hi:
+            best = function(best, function(sa[last_block * BLOCK:hi]))
+        return best
+
+    def _in_window(self, lo, hi, start, limit, how):
+        """Positions of sa[lo:hi] in [start, limit]: the smallest (how='min', -1 if none), the largest ('max'), or
+        how many there are ('count')"""
+        sa = self._sa
+        first_block = -(-lo // BLOCK)  # blocks completely inside [lo, hi)
+        last_block = hi // BLOCK
+        if hi - lo <= SCAN_LIMIT or first_block >= last_block:
+            edges, runs = [sa[lo:hi]], ()
+        else:
+            if self._tree is None:
+                self._tree = _MergeTree(sa)
+            edges = [sa[lo:first_block * BLOCK], sa[last_block * BLOCK:hi]]
+            runs = self._tree.runs(first_block, last_block)
+        found = [p for edge in edges for p in edge if start <= p <= limit]
+        if how == 'count':
+            return len(found) + sum(bisect_right(level, limit, a, b) - bisect_left(level, start, a, b)
+                                    for level, a, b in runs)
+        for level, a, b in runs:
+            if how == 'min':
+                i = bisect_left(level, start, a, b)
+                if i < b and level[i] <= limit:
+                    found.append(level[i])
+            else:
+                i = bisect_right(level, limit, a, b) - 1
+                if i >= a and level[i] >= start:
+                    found.append(level[i])
+        if not found:
+            return -1
+        return min(found) if how == 'min' else max(found)
+
+    def _windowed(self, pattern, start, end, last):
+        if not pattern:
+            return self.text.rfind(pattern, start, end) if last else self.text.find(pattern, start, end)
+        n = len(self.text)
+        start, end, _ = slice(start, end).indices(n)
+        limit = end - len(pattern)  # last possible position inside the window
+        if limit < start:
+            return -1
+        lo, hi = self._range(pattern)
+        if lo == hi:
+            return -1
+        if start == 0 and limit >= n - len(pattern):  # no window: O(1) with the block tables
+            return self._extreme(lo, hi, 1 if last else 0)
+        return self._in_window(lo, hi, start, limit, 'max' if last else 'min')
+
+    def find(self, pattern, start=None, end=None):
+        return self._windowed(pattern, start, end, False)
+
+    def rfind(self, pattern, start=None, end=None):
+        return self._windowed(pattern, start, end, True)
+
+    def index(self, pattern, start=None, end=None):
+        position = self.find(pattern, start, end)
+        if position == -1:
+            raise ValueError('substring not found')
+        return position
+
+    def rindex(self, pattern, start=None, end=None):
+        position = self.rfind(pattern, start, end)
+        if position == -1:
+            raise ValueError('substring not found')
+        return position
+
+    def count_overlapping(self, pattern, start=None, end=None):
+        """Number of occurrences inside text[start:end], overlapping ones included (unlike str.count)"""
+        n = len(self.text)
+        if start is not None and start > n:
+            return 0
+        start, end, _ = slice(start, end).indices(n)
+        limit = end - len(pattern)
+        if limit < start:
+            return 0
+        if not pattern:
+            return limit - start + 1
+        lo, hi = self._range(pattern)
+        if start == 0 and limit >= n - len(pattern):
+            return hi - lo
+        return self._in_window(lo, hi, start, limit, 'count')
+
+    def findall(self, pattern, start=None, end=None):
+        """Sorted positions of every (overlapping) occurrence inside text[start:end]"""
+        if start is not None and start > len(self.text):
+            return []
+        start, end, _ = slice(start, end).indices(len(self.text))
+        if not pattern:
+            return list(range(start, end + 1))  # empty when end < start, like str.find('', 5, 3) == -1
+        lo, hi = self._range(pattern)
+        limit = end - len(pattern)
+        return sorted(p for p in self._sa[lo:hi] if start <= p <= limit)
+
+    # ----- persistence -----
+
+    def save(self, path):
+        is_bytes = not isinstance(self.text, str)
+        encoded = bytes(self.text) if is_bytes else self.text.encode('utf-8')
+        sa = self._sa if isinstance(self._sa, array) else array(_typecode(len(self.text)), self._sa)
+        with open(path, 'wb') as stream:
+            stream.write(_HEADER.pack(_MAGIC, is_bytes, sa.itemsize, len(self.text), len(encoded)))
+            stream.write(encoded)
+            stream.write(b'\x00' * (-stream.tell() % 8))  # the suffix array starts on an 8 byte boundary
+            sa.tofile(stream)
+
+    @classmethod
+    def load(cls, path):
+        """Open a saved index, the suffix array stays in the mapped file"""
+        with open(path, 'rb') as stream:
+            mm = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, is_bytes, itemsize, n, encoded_size = _HEADER.unpack_from(mm)
+        if magic != _MAGIC:
+            mm.close()
+            raise ValueError('not a suffix index file: ' + str(path))
+        offset = _HEADER.size
+        encoded = mm[offset:offset + encoded_size]
+        text = encoded if is_bytes else encoded.decode('utf-8')
+        offset += encoded_size + (-(offset + encoded_size) % 8)
+        typecode = 'i' if itemsize == 4 else 'q'
+        sa = memoryview(mm)[offset:offset + n * itemsize].cast(typecode)
+        index = cls(text, sa)
+        index._mmap = mm
+        return index
+
+    def close(self):
+        if self._mmap is not None:
+            self._sa.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# ======= BENCHMARK ======= #
+
+if __name__ == '__main__':
+    import os
+    import random
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200000  # characters
+    random.seed(0)
+    words = ['line', 'hello', 'hi', 'python', 'string', 'find', 'index', 'été', 'unicode']
+    text = ' '.join(random.choices(words, k=size // 5))[:size]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = SuffixIndex(text)
+    build = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{} characters: build {:.2f} s, peak {:.1f} MB while building, suffix array {:.1f} MB'.format(
+        len(text), build, peak / 1e6, len(index._sa) * index._sa.itemsize / 1e6))
+
+    patterns = [text[i:i + random.randint(3, 12)] for i in random.sample(range(len(text) - 12), 500)]
+    patterns += ['absent{}'.format(i) for i in range(100)]
+    queries = [(p, random.randrange(len(text))) for p in patterns]
+    start = time.perf_counter()
+    index.rfind('hi')
+    print('  block tables for find / rfind: {:.3f} s (first call)'.format(time.perf_counter() - start))
+    start = time.perf_counter()
+    index.find(' ', 1)
+    print('  merge sort tree for windows:   {:.3f} s (first call), {:.1f} MB'.format(
+        time.perf_counter() - start, sum(len(level) * level.itemsize for level in index._tree.levels) / 1e6))
+
+    def run(label, func):
+        start = time.perf_counter()
+        result = [func(p, s) for p, s in queries]
+        elapsed = time.perf_counter() - start
+        print('  {:<34} {:>8.1f} us per query'.format(label, elapsed / len(queries) * 1e6))
+        return result
+
+    assert run('str.rfind(p)', lambda p, s: text.rfind(p)) == run('SuffixIndex.rfind(p)', lambda p, s: index.rfind(p))
+    assert run('str.find(p, start)', lambda p, s: text.find(p, s)) == run('SuffixIndex.find(p, start)',
+                                                                         lambda p, s: index.find(p, s))
+    assert run('str.rfind(p, 0, start)', lambda p, s: text.rfind(p, 0, s)) == run(
+        'SuffixIndex.rfind(p, 0, start)', lambda p, s: index.rfind(p, 0, s))
+    run('SuffixIndex.count_overlapping(p)', lambda p, s: index.count_overlapping(p))
+    run('count_overlapping(p, start)', lambda p, s: index.count_overlapping(p, s))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'text.sufidx')
+        index.save(path)
+        start = time.perf_counter()
+        with SuffixIndex.load(path) as loaded:
+            print('  load (mmap) {:.3f} s'.format(time.perf_counter() - start))
+            assert [loaded.find(p, s) for p, s in queries] == [text.find(p, s) for p, s in queries]
@@ -0,0 +1,156 @@
+# ======== STREAMING TRANSCODER ========= #
+
+"""
+Module 2 (encoding): text read with the wrong code page shows garbage characters (mojibake), UTF-8 is the fix.
+Converting a legacy file is usually written as:
+
+    text = open(path, encoding='cp1252').read()          # the whole file in memory
+    open(out, 'w', encoding='utf-8').write(text)
+
+transcode_file does the same in constant memory: the file is read chunk by chunk and goes through an incremental
+decoder and an incremental encoder (codecs). The incremental decoder keeps the first bytes of a multi-byte sequence
+cut by the end of a chunk and finishes it with the next chunk, so a chunk border never breaks a character.
+
+When the source encoding is not given:
+    - detect_bom: a byte order mark at the start of the file gives the encoding (UTF-8, UTF-16, UTF-32)
+    - guess_encoding: a cheap guess on the first bytes only: valid UTF-8, UTF-16 without BOM (every other byte is 0),
+      Cyrillic or Western single byte code pages (cp1251 / cp1252 / latin-1)
+The BOM is never copied to the output (the BOM aware decoders remove it).
+"""
+
+import codecs
+
+CHUNK_SIZE = 1 << 20
+SAMPLE_SIZE = 64 << 10
+
+_BOMS = [  # longest first: the UTF-32-LE BOM starts with the UTF-16-LE one
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+# bytes that are not defined in cp1252: a file containing them is not cp1252
+_CP1252_UNDEFINED = bytes([0x81, 0x8D, 0x8F, 0x90, 0x9D])
+
+
+def detect_bom(data):
+    """Encoding given by the byte order mark at the start of data, or None"""
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return encoding
+    return None
+
+
+def guess_encoding(sample):
+    """Cheap guess of the encoding of sample (the first bytes of a file)"""
+    encoding = detect_bom(sample)
+    if encoding:
+        return encoding
+    if sample.isascii():
+        return 'utf-8' if b'\x00' not in sample else _guess_utf16(sample) or 'utf-8'
+    try:
+        codecs.utf_8_decode(sample, 'strict', False)  # final=False: a sequence cut by the end of the sample is fine
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    encoding = _guess_utf16(sample)
+    if encoding:
+        return encoding
+    high = sample.translate(None, bytes(range(0x80)))  # only the non-ASCII bytes
+    # cp1251: Cyrillic letters are 0xC0 - 0xFF and make most of the non-ASCII text; in Western text, accented
+    # letters are a few bytes between ASCII words
+    cyrillic = len(high) - len(high.translate(None, bytes(range(0xC0, 0x100))))
+    if len(high) > len(sample) // 4 and cyrillic > len(high) * 0.8:
+        return 'cp1251'
+    if high.translate(None, _CP1252_UNDEFINED) != high:
+        return 'latin-1'
+    return 'cp1252'
+
+
+def _guess_utf16(sample):
+    even = sample[0::2]
+    odd = sample[1::2]
+    if len(sample) < 4:
+        return None
+    if odd.count(0) > len(odd) * 0.4 and even.count(0) < len(even) * 0.1:
+        return 'utf-16-le'
+    if even.count(0) > len(even) * 0.4 and odd.count(0) < len(odd) * 0.1:
+        return 'utf-16-be'
+    return None
+
+
+def transcode_stream(source, target, from_encoding=None, to_encoding='utf-8', errors='strict',
+                     chunk_size=CHUNK_SIZE, sample_size=SAMPLE_SIZE):
+    """Copy the binary stream source to target, from from_encoding (guessed if None) to to_encoding.
+    Return (source encoding, bytes read, bytes written)."""
+    chunk = source.read(max(chunk_size, sample_size) if from_encoding is None else chunk_size)
+    if from_encoding is None:
+        from_encoding = guess_encoding(chunk[:sample_size])
+    elif from_encoding.replace('_', '-').lower() in ('utf-8', 'utf8') and chunk.startswith(codecs.BOM_UTF8):
+        from_encoding = 'utf-8-sig'
+    decoder = codecs.getincrementaldecoder(from_encoding)(errors)
+    encoder = codecs.getincrementalencoder(to_encoding)(errors)
+    read = written = 0
+    while chunk:
+        read += len(chunk)
+        data = encoder.encode(decoder.decode(chunk))
+        target.write(data)
+        written += len(data)
+        chunk = source.read(chunk_size)
+    data = encoder.encode(decoder.decode(b'', final=True), final=True)  # raise on a truncated last sequence
+    target.write(data)
+    return from_encoding, read, written + len(data)
+
+
+def transcode_file(source_path, target_path, from_encoding=None, to_encoding='utf-8', errors='strict',
+                   chunk_size=CHUNK_SIZE):
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        return transcode_stream(source, target, from_encoding, to_encoding, errors, chunk_size)
+
+
+# ======= BENCHMARK ======= #
+
+if __name__ == '__main__':
+    import os
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50 << 20  # characters
+    samples = {
+        'cp1252': 'Le café est très bon, ça coûte 2 €. Größe, naïve, déjà vu.\n',
+        'cp1251': 'Привет, как дела? '
+                  'Всё хорошо, спасибо большое за помощь.\n',
+        'utf-16': 'Hello 世界, café 😀 — unicode everywhere.\n',
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for encoding, line in samples.items():
+            source_path = os.path.join(tmp, encoding + '.txt')
+            with open(source_path, 'w', encoding=encoding) as stream:
+                stream.write(line * (size // len(line)))
+            mb = os.path.getsize(source_path) / 1e6
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            with open(source_path, encoding=encoding) as stream:
+                text = stream.read()
+            with open(os.path.join(tmp, 'whole.txt'), 'w', encoding='utf-8') as stream:
+                stream.write(text)
+            whole = time.perf_counter() - start
+            _, whole_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del text
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            guessed, _, _ = transcode_file(source_path, os.path.join(tmp, 'out.txt'))
+            streamed = time.perf_counter() - start
+            _, stream_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(os.path.join(tmp, 'out.txt'), 'rb') as a, open(os.path.join(tmp, 'whole.txt'), 'rb') as b:
+                assert a.read() == b.read()
+            print('{:<7} {:>6.1f} MB (guessed {:<8}) read whole: {:>6.1f} MB/s peak {:>6.1f} MB | '
+                  'transcode_file: {:>6.1f} MB/s peak {:>5.1f} MB'.format(
+                      encoding, mb, guessed, mb / whole, whole_peak / 1e6, mb / streamed, stream_peak / 1e6))